@@ -16,7 +16,7 @@ load_dotenv()
 from app.core.config import settings
 from app.core.database import Base
 from app.models.user import User
-from app.models.document import Document, DocumentChunk, DocumentCategory, DocumentTag, DocumentVersion
+from app.models.document import Document, DocumentChunk, DocumentCategory, DocumentTag, DocumentVersion, EmbeddingCache
 from app.models.chat import ChatSession, ChatMessage
 from app.models.meeting import Meeting, MeetingAttendee, MeetingDocument, AgendaItem
 from app.models.board import BoardMember, Committee, CommitteeMember, OfficerRole
@@ -0,0 +1,37 @@
+"""Cascade chat message deletes from chat_sessions
+
+Revision ID: 26fe13b50230
+Revises: 65321c29b09a
+Create Date: 2026-10-16 09:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '26fe13b50230'
+down_revision = '65321c29b09a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Recreate the session FK with ON DELETE CASCADE so deleting a session
+    # removes its messages in the same statement
+    op.drop_constraint('chat_messages_session_id_fkey', 'chat_messages', type_='foreignkey')
+    op.create_foreign_key(
+        'chat_messages_session_id_fkey',
+        'chat_messages', 'chat_sessions',
+        ['session_id'], ['id'],
+        ondelete='CASCADE'
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('chat_messages_session_id_fkey', 'chat_messages', type_='foreignkey')
+    op.create_foreign_key(
+        'chat_messages_session_id_fkey',
+        'chat_messages', 'chat_sessions',
+        ['session_id'], ['id']
+    )
@@ -0,0 +1,30 @@
+"""Index chat_messages by session and creation time
+
+Revision ID: 4b8d2f6e1a07
+Revises: 9c3e7a41d2b8
+Create Date: 2026-10-16 11:38:52.120846
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b8d2f6e1a07'
+down_revision = '9c3e7a41d2b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Serves a session's messages in display order straight from the index
+    op.create_index(
+        'ix_chat_messages_session_id_created_at',
+        'chat_messages',
+        ['session_id', 'created_at', 'id'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_chat_messages_session_id_created_at', table_name='chat_messages')
@@ -0,0 +1,51 @@
+"""Index documents for listing and filename/summary search
+
+Revision ID: 7e2c9a5d3f14
+Revises: 4b8d2f6e1a07
+Create Date: 2026-10-16 14:05:17.482913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7e2c9a5d3f14'
+down_revision = '4b8d2f6e1a07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Serves filtered document listings newest-first without a sort
+    op.create_index(
+        'ix_documents_owner_folder_type_created_at',
+        'documents',
+        ['owner_id', 'folder', 'file_type', sa.text('created_at DESC')],
+        unique=False
+    )
+
+    # Trigram indexes let ILIKE '%term%' searches use an index scan
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index(
+        'ix_documents_original_filename_trgm',
+        'documents',
+        ['original_filename'],
+        unique=False,
+        postgresql_using='gin',
+        postgresql_ops={'original_filename': 'gin_trgm_ops'}
+    )
+    op.create_index(
+        'ix_documents_summary_trgm',
+        'documents',
+        ['summary'],
+        unique=False,
+        postgresql_using='gin',
+        postgresql_ops={'summary': 'gin_trgm_ops'}
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_documents_summary_trgm', table_name='documents')
+    op.drop_index('ix_documents_original_filename_trgm', table_name='documents')
+    op.drop_index('ix_documents_owner_folder_type_created_at', table_name='documents')
@@ -0,0 +1,30 @@
+"""Index chat_sessions by user and creation time
+
+Revision ID: 9c3e7a41d2b8
+Revises: 26fe13b50230
+Create Date: 2026-10-16 11:04:27.551093
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c3e7a41d2b8'
+down_revision = '26fe13b50230'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Serves the per-user, newest-first session listing from one index scan
+    op.create_index(
+        'ix_chat_sessions_user_id_created_at',
+        'chat_sessions',
+        ['user_id', sa.text('created_at DESC')],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_chat_sessions_user_id_created_at', table_name='chat_sessions')
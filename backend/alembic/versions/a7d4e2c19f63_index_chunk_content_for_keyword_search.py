@@ -0,0 +1,28 @@
+"""Index chunk content for keyword search
+
+Revision ID: a7d4e2c19f63
+Revises: f19b6d3e8a45
+Create Date: 2026-10-16 19:42:17.308214
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7d4e2c19f63'
+down_revision = 'f19b6d3e8a45'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Matches the expression searched by EmbeddingService.search_chunks_by_keyword
+    op.execute(
+        'CREATE INDEX ix_document_chunks_content_tsv ON document_chunks '
+        "USING gin (to_tsvector('simple', content))"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_document_chunks_content_tsv', table_name='document_chunks')
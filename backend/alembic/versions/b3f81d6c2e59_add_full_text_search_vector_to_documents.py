@@ -0,0 +1,55 @@
+"""Add full-text search vector to documents
+
+Revision ID: b3f81d6c2e59
+Revises: 7e2c9a5d3f14
+Create Date: 2026-10-16 14:31:46.205731
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3f81d6c2e59'
+down_revision = '7e2c9a5d3f14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'documents',
+        sa.Column(
+            'search_vector',
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                "to_tsvector('english', coalesce(original_filename, '') || ' ' || coalesce(summary, ''))",
+                persisted=True
+            ),
+            nullable=True
+        )
+    )
+    op.create_index(
+        'ix_documents_search_vector',
+        'documents',
+        ['search_vector'],
+        unique=False,
+        postgresql_using='gin'
+    )
+
+    # Summary search now goes through the search vector
+    op.drop_index('ix_documents_summary_trgm', table_name='documents')
+
+
+def downgrade() -> None:
+    op.create_index(
+        'ix_documents_summary_trgm',
+        'documents',
+        ['summary'],
+        unique=False,
+        postgresql_using='gin',
+        postgresql_ops={'summary': 'gin_trgm_ops'}
+    )
+    op.drop_index('ix_documents_search_vector', table_name='documents')
+    op.drop_column('documents', 'search_vector')
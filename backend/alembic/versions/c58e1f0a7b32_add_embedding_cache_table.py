@@ -0,0 +1,32 @@
+"""Add embedding cache table
+
+Revision ID: c58e1f0a7b32
+Revises: e4a7c2b9d861
+Create Date: 2026-10-16 15:40:28.631590
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from pgvector.sqlalchemy import Vector
+
+
+# revision identifiers, used by Alembic.
+revision = 'c58e1f0a7b32'
+down_revision = 'e4a7c2b9d861'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'embedding_cache',
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('model', sa.String(), nullable=False),
+        sa.Column('embedding', Vector(1024), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('content_hash')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('embedding_cache')
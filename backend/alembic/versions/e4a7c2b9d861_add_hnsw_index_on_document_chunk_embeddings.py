@@ -0,0 +1,32 @@
+"""Add HNSW index on document chunk embeddings
+
+Revision ID: e4a7c2b9d861
+Revises: b3f81d6c2e59
+Create Date: 2026-10-16 15:12:03.917254
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a7c2b9d861'
+down_revision = 'b3f81d6c2e59'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Lets ORDER BY embedding <=> :query LIMIT k use an approximate index scan
+    op.create_index(
+        'ix_document_chunks_embedding_hnsw',
+        'document_chunks',
+        ['embedding'],
+        unique=False,
+        postgresql_using='hnsw',
+        postgresql_ops={'embedding': 'vector_cosine_ops'}
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_document_chunks_embedding_hnsw', table_name='document_chunks')
@@ -0,0 +1,37 @@
+"""Index chunk embeddings at half precision
+
+Revision ID: f19b6d3e8a45
+Revises: c58e1f0a7b32
+Create Date: 2026-10-16 16:08:41.550172
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f19b6d3e8a45'
+down_revision = 'c58e1f0a7b32'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Stored vectors stay float32 for exact reranking; only the index is halfvec
+    op.drop_index('ix_document_chunks_embedding_hnsw', table_name='document_chunks')
+    op.execute(
+        'CREATE INDEX ix_document_chunks_embedding_halfvec_hnsw ON document_chunks '
+        'USING hnsw ((embedding::halfvec(1024)) halfvec_cosine_ops)'
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_document_chunks_embedding_halfvec_hnsw', table_name='document_chunks')
+    op.create_index(
+        'ix_document_chunks_embedding_hnsw',
+        'document_chunks',
+        ['embedding'],
+        unique=False,
+        postgresql_using='hnsw',
+        postgresql_ops={'embedding': 'vector_cosine_ops'}
+    )
@@ -1,3 +1,4 @@
+import asyncio
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
@@ -41,11 +42,12 @@ async def register(
                 detail="Username already taken"
             )
 
-    # Create new user
+    # Create new user (bcrypt is slow, so hash off the event loop)
+    hashed_password = await asyncio.to_thread(get_password_hash, request.password)
     user = User(
         email=request.email,
         username=request.username,
-        hashed_password=get_password_hash(request.password),
+        hashed_password=hashed_password,
         full_name=request.full_name,
         is_active=True,
         is_admin=False
@@ -67,7 +69,7 @@ async def login(
     # Find user
     user = db.query(User).filter(User.username == request.username).first()
 
-    if not user or not verify_password(request.password, user.hashed_password):
+    if not user or not await asyncio.to_thread(verify_password, request.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
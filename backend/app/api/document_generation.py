@@ -74,13 +74,7 @@ async def generate_document(
         Generated document information and download URL
     """
     try:
-        # Generate the document
         generator = DocumentGenerator()
-        document_bytes = generator.generate_document(
-            template_type=request.template_type,
-            data=request.data,
-            format=request.format
-        )
 
         # Generate filename
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -91,9 +85,14 @@ async def generate_document(
             # Save to document library
             doc_service = DocumentService()
 
-            # Save file to storage
-            file_path = doc_service._save_file(
-                file_content=document_bytes,
+            # Generate the document straight into storage
+            file_path, file_size = doc_service.save_generated_file(
+                lambda sink: generator.generate_document(
+                    template_type=request.template_type,
+                    data=request.data,
+                    format=request.format,
+                    sink=sink
+                ),
                 filename=filename,
                 original_filename=filename
             )
@@ -104,7 +103,7 @@ async def generate_document(
                 description=f"Generated {generator.TEMPLATE_TYPES.get(request.template_type, request.template_type)}",
                 file_name=filename,
                 file_path=file_path,
-                file_size=len(document_bytes),
+                file_size=file_size,
                 mime_type="application/pdf" if request.format == "pdf" else "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
                 uploaded_by=current_user.id,
                 processed=False  # Generated documents don't need processing
@@ -115,12 +114,19 @@ async def generate_document(
             db.refresh(document)
 
             document_id = document.id
+        else:
+            # Generate the document
+            file_size = len(generator.generate_document(
+                template_type=request.template_type,
+                data=request.data,
+                format=request.format
+            ))
 
         return GenerateDocumentResponse(
             document_id=document_id,
             filename=filename,
             format=request.format,
-            size=len(document_bytes),
+            size=file_size,
             download_url=f"/api/v1/documents/{document_id}/download" if document_id else f"/api/v1/document-generation/download/{filename}"
         )
 
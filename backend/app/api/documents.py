@@ -1,7 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status, Query
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
+from sqlalchemy import func
 from typing import Optional
+import asyncio
 import os
 import time
 from datetime import datetime
@@ -21,6 +23,7 @@ from app.schemas.document import (
 from app.services.document_service import DocumentService
 from app.services.text_extraction import TextExtractionService
 from app.services.embedding_service import EmbeddingService
+from app.services.semantic_cache import invalidate_library_caches
 
 
 router = APIRouter()
@@ -46,7 +49,7 @@ async def upload_document(
         file_size = len(file_content)
 
         # Create document
-        document = DocumentService.create_document(
+        document = await DocumentService.create_document(
             db=db,
             original_filename=file.filename,
             file_size=file_size,
@@ -102,28 +105,37 @@ async def list_documents(
     # Admin sees all, regular users see only their own
     owner_id = None if current_user.is_admin else current_user.id
 
-    # Get documents
-    documents, total = DocumentService.list_documents(
-        db=db,
-        owner_id=owner_id,
-        folder=folder,
-        file_type=file_type,
-        search=search,
-        skip=skip,
-        limit=page_size
-    )
+    def load_page():
+        documents, total = DocumentService.list_documents(
+            db=db,
+            owner_id=owner_id,
+            folder=folder,
+            file_type=file_type,
+            search=search,
+            skip=skip,
+            limit=page_size
+        )
+
+        # Count chunks for the whole page in one grouped query
+        chunk_counts = dict(
+            db.query(DocumentChunk.document_id, func.count(DocumentChunk.id))
+            .filter(DocumentChunk.document_id.in_([doc.id for doc in documents]))
+            .group_by(DocumentChunk.document_id)
+            .all()
+        ) if documents else {}
+
+        return documents, total, chunk_counts
+
+    # Get documents; the queries run in a worker thread so the event loop
+    # keeps serving other requests during the roundtrips
+    documents, total, chunk_counts = await asyncio.to_thread(load_page)
 
     # Build response with chunk counts
     doc_responses = []
     for doc in documents:
         doc_response = DocumentResponse.model_validate(doc)
         doc_response.is_processed = doc.extracted_text is not None
-
-        # Count chunks
-        chunk_count = db.query(DocumentChunk).filter(
-            DocumentChunk.document_id == doc.id
-        ).count()
-        doc_response.chunk_count = chunk_count if chunk_count > 0 else None
+        doc_response.chunk_count = chunk_counts.get(doc.id)
 
         doc_responses.append(doc_response)
 
@@ -151,7 +163,7 @@ async def get_document_stats(
     - Admin users see stats for all documents
     """
     owner_id = None if current_user.is_admin else current_user.id
-    stats = DocumentService.get_document_stats(db=db, owner_id=owner_id)
+    stats = await asyncio.to_thread(DocumentService.get_document_stats, db=db, owner_id=owner_id)
     return stats
 
 
@@ -388,7 +400,7 @@ async def process_document(
         # Step 4: Generate embeddings if requested
         embeddings = []
         if process_request.generate_embeddings:
-            embeddings = embedding_service.generate_embeddings_batch(chunks)
+            embeddings = await embedding_service.generate_embeddings_batch_async(chunks, db=db)
         else:
             embeddings = [None] * len(chunks)
 
@@ -402,8 +414,9 @@ async def process_document(
                 embedding=embedding
             )
 
-        # Commit document updates
+        # Commit document updates; cached chat replies may quote the old chunks
         db.commit()
+        invalidate_library_caches()
 
         # Calculate processing time
         processing_time = time.time() - start_time
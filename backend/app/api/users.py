@@ -1,3 +1,4 @@
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 from typing import Optional
@@ -82,11 +83,12 @@ async def create_user(
                 detail="Username already taken"
             )
 
-    # Create new user
+    # Create new user (bcrypt is slow, so hash off the event loop)
+    hashed_password = await asyncio.to_thread(get_password_hash, user_data.password)
     user = User(
         email=user_data.email,
         username=user_data.username,
-        hashed_password=get_password_hash(user_data.password),
+        hashed_password=hashed_password,
         full_name=user_data.full_name,
         is_active=True,
         is_admin=False
@@ -135,7 +137,9 @@ async def update_user(
 
     # Handle password separately
     if "password" in update_data:
-        update_data["hashed_password"] = get_password_hash(update_data.pop("password"))
+        update_data["hashed_password"] = await asyncio.to_thread(
+            get_password_hash, update_data.pop("password")
+        )
 
     for field, value in update_data.items():
         setattr(user, field, value)
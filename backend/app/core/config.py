@@ -13,6 +13,9 @@ class Settings(BaseSettings):
 
     # Database
     database_url: str
+    db_pool_size: int = 20
+    db_max_overflow: int = 10
+    db_pool_recycle_seconds: int = 1800
 
     # Authentication
     secret_key: str
@@ -27,6 +30,18 @@ class Settings(BaseSettings):
     # Voyage AI (for embeddings)
     voyage_api_key: str
     voyage_model: str = "voyage-law-2"
+    voyage_requests_per_minute: int = 2000
+    voyage_tokens_per_minute: int = 3_000_000
+
+    # Semantic response cache (paraphrased questions reuse a prior answer)
+    semantic_cache_threshold: float = 0.93
+    semantic_cache_ttl_seconds: int = 6 * 3600
+
+    # Web search result cache (repeated statute lookups skip DuckDuckGo)
+    web_search_cache_ttl_seconds: int = 3600
+    web_search_cache_threshold: float = 0.92
+    # Issue the broad fallback query alongside the site-restricted one instead of after it
+    web_search_parallel_fallback: bool = True
 
     # File Storage
     upload_dir: str = "./uploads"
@@ -3,9 +3,14 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
 
+# Connections are recycled on a timer instead of pinged on every checkout,
+# which would add a SELECT 1 round-trip to each request
 engine = create_engine(
     settings.database_url,
-    pool_pre_ping=True,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_recycle=settings.db_pool_recycle_seconds,
+    pool_use_lifo=True,
     echo=settings.debug
 )
 
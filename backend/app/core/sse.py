@@ -0,0 +1,56 @@
+"""
+Server-Sent Events framing helpers shared by the streaming chat endpoints.
+"""
+
+from typing import Any, Dict
+import orjson
+
+SSE_PREFIX = b"data: "
+SSE_SUFFIX = b"\n\n"
+
+
+def sse_event(payload: Dict[str, Any]) -> bytes:
+    """
+    Encode a payload as a single SSE `data:` frame
+
+    Args:
+        payload: JSON-serializable event body
+
+    Returns:
+        Frame bytes ready to be written to a text/event-stream response
+    """
+    return SSE_PREFIX + orjson.dumps(payload) + SSE_SUFFIX
+
+
+CONTENT_FRAME_PREFIX = b'data: {"type":"content","content":'
+CITATION_FRAME_PREFIX = b'data: {"type":"citation","citation":'
+FRAME_SUFFIX = b'}\n\n'
+DONE_FRAME = b'data: {"type":"done"}\n\n'
+
+
+def sse_content(text: str) -> bytes:
+    """
+    Encode a streamed text chunk as a `content` frame
+
+    Only the text is JSON-encoded; the envelope is a pre-serialized template.
+
+    Args:
+        text: Assistant text chunk
+
+    Returns:
+        Frame bytes
+    """
+    return CONTENT_FRAME_PREFIX + orjson.dumps(text) + FRAME_SUFFIX
+
+
+def sse_citation(citation: Dict[str, Any]) -> bytes:
+    """
+    Encode a citation as a `citation` frame
+
+    Args:
+        citation: Citation payload
+
+    Returns:
+        Frame bytes
+    """
+    return CITATION_FRAME_PREFIX + orjson.dumps(citation) + FRAME_SUFFIX
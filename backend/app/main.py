@@ -1,6 +1,8 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
+from app.core.logging_config import configure_logging
+from app.services.web_search import close_http_client
 
 # Import all models to ensure SQLAlchemy knows about them
 from app.models.user import User
@@ -12,6 +14,8 @@ from app.models.resolution import Resolution, ResolutionVote, ActionItem
 from app.models.compliance import ComplianceItem, ComplianceHistory
 from app.models.notification import Notification
 
+configure_logging()
+
 app = FastAPI(
     title=settings.app_name,
     debug=settings.debug
@@ -31,6 +35,12 @@ app.add_middleware(
 )
 
 
+@app.on_event("shutdown")
+async def shutdown():
+    """Release shared HTTP connections"""
+    await close_http_client()
+
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
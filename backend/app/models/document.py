@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Float, Boolean, Table
-from sqlalchemy.sql import func
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Float, Boolean, Table, Index, Computed
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.sql import func, text
 from sqlalchemy.orm import relationship
 from pgvector.sqlalchemy import Vector
 from app.core.database import Base
@@ -28,6 +29,13 @@ class Document(Base):
     # Document content and metadata
     extracted_text = Column(Text, nullable=True)
     summary = Column(Text, nullable=True)
+    search_vector = Column(
+        TSVECTOR,
+        Computed(
+            "to_tsvector('english', coalesce(original_filename, '') || ' ' || coalesce(summary, ''))",
+            persisted=True
+        )
+    )
 
     # Folder/organization
     folder = Column(String, nullable=True, default="/")
@@ -56,6 +64,19 @@ class Document(Base):
     versions = relationship("DocumentVersion", back_populates="document", cascade="all, delete-orphan", foreign_keys="DocumentVersion.document_id")
     parent_document = relationship("Document", remote_side=[id], foreign_keys=[parent_document_id])
 
+    __table_args__ = (
+        Index(
+            "ix_documents_owner_folder_type_created_at",
+            "owner_id", "folder", "file_type", created_at.desc()
+        ),
+        # Trigram index lets the ILIKE '%term%' filename search avoid a sequential scan
+        Index(
+            "ix_documents_original_filename_trgm", "original_filename",
+            postgresql_using="gin", postgresql_ops={"original_filename": "gin_trgm_ops"}
+        ),
+        Index("ix_documents_search_vector", "search_vector", postgresql_using="gin"),
+    )
+
 
 class DocumentChunk(Base):
     """Stores document chunks with their embeddings for RAG"""
@@ -78,6 +99,32 @@ class DocumentChunk(Base):
     # Relationships
     document = relationship("Document", back_populates="chunks")
 
+    __table_args__ = (
+        # Half-precision HNSW index: half the size and scan bandwidth of a float32 index
+        Index(
+            "ix_document_chunks_embedding_halfvec_hnsw",
+            text("(embedding::halfvec(1024)) halfvec_cosine_ops"),
+            postgresql_using="hnsw"
+        ),
+        # Statute-number keyword search filters on this exact expression
+        Index(
+            "ix_document_chunks_content_tsv",
+            func.to_tsvector(text("'simple'"), content),
+            postgresql_using="gin"
+        ),
+    )
+
+
+class EmbeddingCache(Base):
+    """Embeddings keyed by a hash of (model, input type, text) so unchanged text is never re-embedded"""
+    __tablename__ = "embedding_cache"
+
+    content_hash = Column(String(64), primary_key=True)  # sha256 hex digest
+    model = Column(String, nullable=False)
+    embedding = Column(Vector(1024), nullable=False)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
 
 class DocumentCategory(Base):
     """Hierarchical categories for document organization"""
@@ -1,23 +1,62 @@
 from typing import List, Dict, Any, Optional, AsyncGenerator
-import json
+import re
 import asyncio
+import heapq
+import logging
+import httpx
+import numpy as np
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from anthropic import AsyncAnthropic
+from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient
 from anthropic.types import MessageStreamEvent
 
 from app.core.config import settings
+from app.core.sse import sse_event
 from app.models.chat import ChatSession, ChatMessage
 from app.models.document import Document
 from app.services.embedding_service import EmbeddingService
 from app.services.web_search import WebSearchService
 
+logger = logging.getLogger(__name__)
+
+
+# Matches Kentucky statute citations such as "KRS 61.805" or "K.R.S. 271B.8-240"
+STATUTE_PATTERN = re.compile(
+    r"\b(?:K\.?R\.?S\.?|Kentucky Revised Statutes?)\s*(?:§\s*)?(\d+[A-Z]?\.\d+(?:-\d+)?)",
+    re.IGNORECASE
+)
+
+# Reciprocal Rank Fusion constant (standard value from Cormack et al.)
+RRF_K = 60
+
+# Maximal Marginal Relevance settings for de-duplicating retrieved chunks
+MMR_LAMBDA = 0.7
+DUPLICATE_SIMILARITY = 0.92
+
+# Shared Anthropic client so connection pools and TLS sessions are reused
+_anthropic_client: Optional[AsyncAnthropic] = None
+
+
+def get_anthropic_client() -> AsyncAnthropic:
+    """Return the process-wide Anthropic client, creating it on first use"""
+    global _anthropic_client
+    if _anthropic_client is None:
+        _anthropic_client = AsyncAnthropic(
+            api_key=settings.anthropic_api_key,
+            max_retries=2,
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=100)
+            )
+        )
+    return _anthropic_client
+
 
 class ChatService:
     """Service for managing chat sessions and AI interactions"""
 
     def __init__(self):
         """Initialize Anthropic async client, embedding service, and web search"""
-        self.client = AsyncAnthropic(api_key=settings.anthropic_api_key)
+        self.client = get_anthropic_client()
         self.model = settings.claude_model
         self.embedding_service = EmbeddingService()
         self.web_search = WebSearchService()
@@ -43,6 +82,13 @@ You have access to:
 
 When web search results are provided, they will be clearly marked. Always indicate which information comes from uploaded documents vs. web sources."""
 
+        # System prompt as a cacheable block so Anthropic reuses the prefix across turns
+        self.system_blocks = [{
+            "type": "text",
+            "text": self.system_prompt,
+            "cache_control": {"type": "ephemeral"}
+        }]
+
     def create_session(
         self,
         db: Session,
@@ -120,14 +166,25 @@ When web search results are provided, they will be clearly marked. Always indica
         Returns:
             Tuple of (sessions list, total count)
         """
-        query = db.query(ChatSession).filter(ChatSession.user_id == user_id)
-        total = query.count()
-
-        sessions = query.order_by(
+        # Fetch the page and the total in one round-trip via COUNT(*) OVER ()
+        rows = db.query(
+            ChatSession,
+            func.count().over().label("total")
+        ).filter(
+            ChatSession.user_id == user_id
+        ).order_by(
             ChatSession.updated_at.desc()
         ).offset(skip).limit(limit).all()
 
-        return sessions, total
+        if rows:
+            return [row[0] for row in rows], rows[0].total
+
+        # Page is past the end (or user has no sessions): no row carries the total
+        total = db.query(ChatSession).filter(
+            ChatSession.user_id == user_id
+        ).count() if skip else 0
+
+        return [], total
 
     def delete_session(
         self,
@@ -154,11 +211,7 @@ When web search results are provided, they will be clearly marked. Always indica
         if not session:
             return False
 
-        # Delete all messages in the session
-        db.query(ChatMessage).filter(
-            ChatMessage.session_id == session_id
-        ).delete()
-
+        # Messages are removed by the ON DELETE CASCADE foreign key
         db.delete(session)
         db.commit()
 
@@ -181,13 +234,13 @@ When web search results are provided, they will be clearly marked. Always indica
         Returns:
             List of ChatMessages
         """
-        # Verify user owns the session
-        session = self.get_session(db, session_id, user_id)
-        if not session:
-            return []
-
-        return db.query(ChatMessage).filter(
-            ChatMessage.session_id == session_id
+        # Joining on the session both verifies ownership and loads the messages,
+        # so an unknown or foreign session simply yields no rows
+        return db.query(ChatMessage).join(
+            ChatSession, ChatSession.id == ChatMessage.session_id
+        ).filter(
+            ChatSession.id == session_id,
+            ChatSession.user_id == user_id
         ).order_by(ChatMessage.created_at).all()
 
     def should_use_web_search(self, query: str) -> bool:
@@ -215,7 +268,8 @@ When web search results are provided, they will be clearly marked. Always indica
         self,
         db: Session,
         query: str,
-        limit: int = 5
+        limit: int = 5,
+        query_embedding: Optional[List[float]] = None
     ) -> List[Dict[str, Any]]:
         """
         Retrieve relevant document chunks for a query using RAG
@@ -224,24 +278,42 @@ When web search results are provided, they will be clearly marked. Always indica
             db: Database session
             query: Search query
             limit: Maximum number of chunks to return
+            query_embedding: Precomputed embedding of the query, if available
 
         Returns:
             List of relevant document chunks with metadata
         """
         # Generate query embedding
-        query_embedding = self.embedding_service.generate_query_embedding(query)
+        if query_embedding is None:
+            query_embedding = self.embedding_service.generate_query_embedding(query)
 
         if not query_embedding:
             return []
 
-        # Search for similar chunks
+        # Search for similar chunks, over-fetching so near-duplicates can be dropped
+        candidate_limit = limit * 2
         results = self.embedding_service.search_similar_chunks(
             db=db,
             query_embedding=query_embedding,
-            limit=limit,
+            limit=candidate_limit,
             min_score=0.5  # Lower threshold for legal documents (0.5 allows more relevant results)
         )
 
+        relevance = [score for _, score in results]
+
+        # Statute numbers are poorly captured by embeddings, so fuse in an
+        # exact keyword match when the query cites one
+        statute_ids = STATUTE_PATTERN.findall(query)
+        if statute_ids:
+            keyword_chunks = self.embedding_service.search_chunks_by_keyword(
+                db=db,
+                terms=statute_ids,
+                limit=limit
+            )
+            results, relevance = self._fuse_results(results, keyword_chunks, query_embedding, candidate_limit)
+
+        results = self._diversify_results(results, relevance, limit)
+
         # Format results with document metadata
         formatted_results = []
         for chunk, score in results:
@@ -262,13 +334,158 @@ When web search results are provided, they will be clearly marked. Always indica
 
         return formatted_results
 
+    def _with_cache_breakpoint(
+        self,
+        conversation: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Mark the end of the stable conversation history as a prompt cache breakpoint
+
+        Everything before the latest user turn is identical on the next request,
+        so caching up to that point lets Anthropic skip re-processing the history.
+
+        Args:
+            conversation: Messages in Anthropic format, latest user turn last
+
+        Returns:
+            Conversation with the last history message converted to a cached block
+        """
+        if len(conversation) < 2:
+            return conversation
+
+        last_stable = conversation[-2]
+        cached = {
+            "role": last_stable["role"],
+            "content": [{
+                "type": "text",
+                "text": last_stable["content"],
+                "cache_control": {"type": "ephemeral"}
+            }]
+        }
+
+        return conversation[:-2] + [cached, conversation[-1]]
+
+    def _diversify_results(
+        self,
+        results: List[tuple],
+        relevance: List[float],
+        limit: int
+    ) -> List[tuple]:
+        """
+        Select a diverse subset of ranked chunks using Maximal Marginal Relevance
+
+        Chunks nearly identical to one already selected are dropped outright so
+        the prompt context does not repeat the same passage. The top-ranked
+        chunk is always kept: after fusion it is usually the exact statute
+        match, which a more similar-looking neighbour must not evict.
+
+        Args:
+            results: (chunk, similarity) tuples in ranked order
+            relevance: Ranking score of each result (fused RRF score or similarity)
+            limit: Maximum results to return
+
+        Returns:
+            Selected (chunk, similarity) tuples in selection order
+        """
+        if len(results) <= 1 or limit <= 1:
+            return results[:limit]
+
+        # Chunks without embeddings cannot be compared; they only fill leftover slots
+        embedded = [i for i, (chunk, _) in enumerate(results) if chunk.embedding is not None]
+        if len(embedded) <= 1:
+            return results[:limit]
+
+        vectors = np.asarray([results[i][0].embedding for i in embedded], dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        vectors /= norms
+        pairwise = vectors @ vectors.T
+
+        # Min-max normalize so the relevance term is on the same 0-1 scale as
+        # the similarity penalty whatever the ranking score
+        scores = np.asarray([relevance[i] for i in embedded], dtype=np.float32)
+        spread = scores.max() - scores.min()
+        scores = (scores - scores.min()) / spread if spread > 0 else np.ones_like(scores)
+
+        kept = [0]
+        selected = [0] if embedded[0] == 0 else []
+        remaining = [pos for pos in range(len(embedded)) if embedded[pos] != 0]
+        while remaining and len(kept) < limit:
+            if selected:
+                max_sim = pairwise[np.ix_(remaining, selected)].max(axis=1)
+            else:
+                max_sim = np.zeros(len(remaining), dtype=np.float32)
+
+            mmr = MMR_LAMBDA * scores[remaining] - (1 - MMR_LAMBDA) * max_sim
+            best = int(np.argmax(mmr))
+            candidate = remaining.pop(best)
+            if max_sim[best] < DUPLICATE_SIMILARITY:
+                selected.append(candidate)
+                kept.append(embedded[candidate])
+
+        if len(kept) < limit:
+            kept += [
+                i for i, (chunk, _) in enumerate(results)
+                if chunk.embedding is None and i != 0
+            ][:limit - len(kept)]
+
+        return [results[i] for i in kept]
+
+    def _fuse_results(
+        self,
+        vector_results: List[tuple],
+        keyword_chunks: List[Any],
+        query_embedding: List[float],
+        limit: int
+    ) -> tuple[List[tuple], List[float]]:
+        """
+        Merge vector and keyword rankings using Reciprocal Rank Fusion
+
+        Args:
+            vector_results: (chunk, similarity) tuples ranked by vector search
+            keyword_chunks: Chunks ranked by keyword search
+            query_embedding: Query vector, used to score keyword-only hits
+            limit: Maximum results to return
+
+        Returns:
+            Tuple of ((chunk, similarity_score) tuples ordered by fused rank,
+            fused score of each)
+        """
+        fused_scores: Dict[int, float] = {}
+        candidates: Dict[int, tuple] = {}
+
+        for rank, (chunk, score) in enumerate(vector_results, 1):
+            fused_scores[chunk.id] = fused_scores.get(chunk.id, 0.0) + 1.0 / (RRF_K + rank)
+            candidates[chunk.id] = (chunk, score)
+
+        keyword_only = []
+        for rank, chunk in enumerate(keyword_chunks, 1):
+            fused_scores[chunk.id] = fused_scores.get(chunk.id, 0.0) + 1.0 / (RRF_K + rank)
+            if chunk.id not in candidates:
+                candidates[chunk.id] = (chunk, 0.0)
+                if chunk.embedding is not None:
+                    keyword_only.append(chunk)
+
+        # Score all keyword-only hits against the query in one pass
+        similarities = self.embedding_service._cosine_similarities(
+            query_embedding, [chunk.embedding for chunk in keyword_only]
+        )
+        for chunk, similarity in zip(keyword_only, similarities):
+            candidates[chunk.id] = (chunk, float(similarity))
+
+        ranked_ids = heapq.nlargest(limit, fused_scores, key=fused_scores.get)
+        return (
+            [candidates[chunk_id] for chunk_id in ranked_ids],
+            [fused_scores[chunk_id] for chunk_id in ranked_ids]
+        )
+
     async def stream_chat_response(
         self,
         db: Session,
         session_id: int,
         user_id: int,
         user_message: str
-    ) -> AsyncGenerator[str, None]:
+    ) -> AsyncGenerator[bytes, None]:
         """
         Stream chat response from Claude with RAG
 
@@ -279,12 +496,12 @@ When web search results are provided, they will be clearly marked. Always indica
             user_message: User's message
 
         Yields:
-            Server-Sent Events formatted strings
+            Server-Sent Events frames as bytes
         """
         # Verify session ownership
         session = self.get_session(db, session_id, user_id)
         if not session:
-            yield f"data: {json.dumps({'type': 'error', 'error': 'Session not found'})}\n\n"
+            yield sse_event({'type': 'error', 'error': 'Session not found'})
             return
 
         # Save user message
@@ -296,11 +513,15 @@ When web search results are provided, they will be clearly marked. Always indica
         db.add(user_msg)
         db.commit()
         
-        # Yield control to allow other async operations
-        await asyncio.sleep(0)
+        # Embed once off the event loop; retrieval and web search share it
+        query_embedding = await asyncio.to_thread(
+            self.embedding_service.generate_query_embedding, user_message
+        )
 
         # Retrieve relevant documents
-        relevant_docs = self.retrieve_relevant_documents(db, user_message, limit=5)
+        relevant_docs = self.retrieve_relevant_documents(
+            db, user_message, limit=5, query_embedding=query_embedding
+        )
 
         # Check if we should use web search
         use_web_search = self.should_use_web_search(user_message)
@@ -309,9 +530,11 @@ When web search results are provided, they will be clearly marked. Always indica
         web_results = []
         if use_web_search:
             try:
-                web_results = await self.web_search.search_kentucky_statutes(user_message, limit=3)
-            except Exception as e:
-                print(f"Web search error: {e}")
+                web_results = await self.web_search.search_kentucky_statutes(
+                    user_message, limit=3, query_embedding=query_embedding
+                )
+            except Exception:
+                logger.exception("Web search error")
                 # Continue without web results
 
         # Build context from retrieved documents
@@ -369,15 +592,15 @@ When web search results are provided, they will be clearly marked. Always indica
             # Send citations first
             if citations:
                 for citation in citations:
-                    yield f"data: {json.dumps({'type': 'citation', 'citation': citation})}\n\n"
+                    yield sse_event({'type': 'citation', 'citation': citation})
 
             # Stream the AI response using async client
             try:
                 async with self.client.messages.stream(
                     model=self.model,
                     max_tokens=4096,
-                    system=self.system_prompt,
-                    messages=conversation
+                    system=self.system_blocks,
+                    messages=self._with_cache_breakpoint(conversation)
                 ) as stream:
                     async for event in stream:
                         if event.type == "content_block_delta":
@@ -385,15 +608,14 @@ When web search results are provided, they will be clearly marked. Always indica
                             if hasattr(event.delta, "text"):
                                 chunk = event.delta.text
                                 assistant_content += chunk
-                                yield f"data: {json.dumps({'type': 'content', 'content': chunk})}\n\n"
+                                yield sse_event({'type': 'content', 'content': chunk})
                         elif event.type == "message_stop":
                             # Stream completed
                             break
             except Exception as stream_error:
                 error_msg = f"Error during streaming: {str(stream_error)}"
-                import traceback
-                traceback.print_exc()  # Log the full error
-                yield f"data: {json.dumps({'type': 'error', 'error': error_msg})}\n\n"
+                logger.exception("Error during streaming")
+                yield sse_event({'type': 'error', 'error': error_msg})
                 return
 
             # Save assistant message
@@ -411,18 +633,16 @@ When web search results are provided, they will be clearly marked. Always indica
                 db.commit()
             except Exception as db_error:
                 # Log but don't fail the stream if DB save fails
-                import traceback
-                traceback.print_exc()
-                yield f"data: {json.dumps({'type': 'error', 'error': f'Failed to save message: {str(db_error)}'})}\n\n"
+                logger.exception("Failed to save assistant message")
+                yield sse_event({'type': 'error', 'error': f'Failed to save message: {str(db_error)}'})
 
             # Send completion event
-            yield f"data: {json.dumps({'type': 'done'})}\n\n"
+            yield sse_event({'type': 'done'})
 
         except Exception as e:
             error_msg = f"Error generating response: {str(e)}"
-            import traceback
-            traceback.print_exc()  # Log the full error
-            yield f"data: {json.dumps({'type': 'error', 'error': error_msg})}\n\n"
+            logger.exception("Error generating response")
+            yield sse_event({'type': 'error', 'error': error_msg})
 
     async def generate_non_streaming_response(
         self,
@@ -506,8 +726,8 @@ When web search results are provided, they will be clearly marked. Always indica
             response = await self.client.messages.create(
                 model=self.model,
                 max_tokens=4096,
-                system=self.system_prompt,
-                messages=conversation
+                system=self.system_blocks,
+                messages=self._with_cache_breakpoint(conversation)
             )
 
             assistant_content = response.content[0].text
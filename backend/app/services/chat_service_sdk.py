@@ -2,10 +2,17 @@
 Chat service using Claude Agent SDK with custom RAG and web search tools.
 """
 
-from typing import List, Dict, Any, Optional, AsyncGenerator
-import json
+from typing import List, Dict, Any, Optional, AsyncGenerator, AsyncIterator
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+import re
 import asyncio
+import hashlib
+import logging
 from datetime import datetime
+import orjson
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from claude_agent_sdk import (
     tool,
@@ -21,27 +28,28 @@ from claude_agent_sdk import (
 )
 
 from app.core.config import settings
+from app.core.database import SessionLocal
 from app.models.chat import ChatSession, ChatMessage
 from app.models.document import Document
 from app.services.embedding_service import EmbeddingService
 from app.services.web_search import WebSearchService
 from app.services.document_generation import DocumentGenerator
 from app.services.document_service import DocumentService
+from app.services.semantic_cache import SemanticQueryCache, ExactQueryCache, ToolResultCache
+from app.core.sse import sse_event, sse_content, sse_citation, DONE_FRAME
 
+logger = logging.getLogger(__name__)
 
-class ChatServiceSDK:
-    """Service for managing chat sessions using Claude Agent SDK"""
 
-    def __init__(self):
-        """Initialize services"""
-        self.embedding_service = EmbeddingService()
-        self.web_search = WebSearchService()
-        self.doc_generator = DocumentGenerator()
-        self.doc_service = DocumentService()
-        self.model = settings.claude_model
+# Document ID reported by the generate_document tool
+DOCUMENT_ID_PATTERN = re.compile(r'Document ID:\s*(\d+)')
+
+# Markers around the citation payload appended to search_documents results
+CITATIONS_START = "__CITATIONS_START__"
+CITATIONS_END = "__CITATIONS_END__"
 
-        # System prompt for the legal assistant
-        self.system_prompt = """You are a professional legal assistant specialized in Kentucky law and board governance. Your role is to:
+# System prompt for the legal assistant
+SYSTEM_PROMPT = """You are a professional legal assistant specialized in Kentucky law and board governance. Your role is to:
 
 1. Provide accurate, well-researched legal information based on the documents in your knowledge base
 2. Help draft and review legal documents, policies, and meeting materials
@@ -68,8 +76,221 @@ When responding:
 - Suggest when a user should consult with a licensed attorney for specific legal advice
 - Format your responses clearly with headings, bullet points, and sections as appropriate"""
 
-    def _create_rag_tool(self, db: Session):
-        """Create a RAG document search tool for a specific database session."""
+# Similarity above which a search_documents query reuses a cached result
+SEARCH_CACHE_THRESHOLD = 0.95
+
+# Lifetime of cached tool results
+TOOL_CACHE_TTL_SECONDS = 300
+
+# Key in Session.info for chat sessions already loaded during the request
+SESSION_CACHE_KEY = "chat_sessions_by_owner"
+
+
+class CitationStreamParser:
+    """
+    Separates citation payloads from visible text across streamed text blocks.
+
+    Markers may be split between blocks, so any trailing text that could be
+    the start of a marker is held back until the next block arrives.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._in_citation = False
+        self._scanned = 0
+
+    @staticmethod
+    def _partial_marker_length(text: str, marker: str) -> int:
+        """Length of the longest suffix of text that is a proper prefix of marker"""
+        for length in range(min(len(marker) - 1, len(text)), 0, -1):
+            if text.endswith(marker[:length]):
+                return length
+        return 0
+
+    def feed(self, text: str) -> tuple[str, List[str]]:
+        """
+        Consume the next streamed text block
+
+        Args:
+            text: Text block from the assistant
+
+        Returns:
+            Tuple of (text safe to show now, completed citation JSON payloads)
+        """
+        self._buffer += text
+        visible = []
+        payloads = []
+
+        while True:
+            if self._in_citation:
+                # Resume the search where the previous block left off
+                end = self._buffer.find(CITATIONS_END, self._scanned)
+                if end < 0:
+                    self._scanned = max(0, len(self._buffer) - len(CITATIONS_END) + 1)
+                    break
+                payloads.append(self._buffer[:end])
+                self._buffer = self._buffer[end + len(CITATIONS_END):]
+                self._in_citation = False
+                self._scanned = 0
+            else:
+                start = self._buffer.find(CITATIONS_START)
+                if start < 0:
+                    held = self._partial_marker_length(self._buffer, CITATIONS_START)
+                    visible.append(self._buffer[:len(self._buffer) - held])
+                    self._buffer = self._buffer[len(self._buffer) - held:]
+                    break
+                visible.append(self._buffer[:start])
+                self._buffer = self._buffer[start + len(CITATIONS_START):]
+                self._in_citation = True
+
+        return "".join(visible), payloads
+
+    def flush(self) -> str:
+        """
+        Release held-back text at the end of the response
+
+        An unterminated citation payload is dropped rather than shown.
+
+        Returns:
+            Remaining visible text
+        """
+        remaining = "" if self._in_citation else self._buffer
+        self._buffer = ""
+        self._in_citation = False
+        self._scanned = 0
+        return remaining
+
+
+@dataclass
+class ToolContext:
+    """Per-turn state read by the MCP tools of a turn's SDK client"""
+    db: Optional[Session]
+    user_id: int
+    session_id: int
+    user_message: Optional[str] = None
+    query_embedding: Optional[List[float]] = None
+    # Files written by generate_document, removed if the turn is not committed
+    generated_files: List[str] = field(default_factory=list)
+
+
+# Tool context of the turn whose SDK client invoked a tool. Each client's
+# message-reader task copies the context when the client connects, so the
+# process-wide MCP server's tools see the state of their own turn.
+current_tool_context: ContextVar[ToolContext] = ContextVar("current_tool_context")
+
+
+class ChatServiceSDK:
+    """Service for managing chat sessions using Claude Agent SDK"""
+
+    ALLOWED_TOOLS = [
+        "mcp__legal__search_documents",
+        "mcp__legal__search_kentucky_statutes",
+        "mcp__legal__generate_document"
+    ]
+
+    def __init__(self):
+        """Initialize services"""
+        self.embedding_service = EmbeddingService()
+        self.web_search = WebSearchService()
+        self.doc_generator = DocumentGenerator()
+        self.doc_service = DocumentService()
+        self.model = settings.claude_model
+        self.query_cache = SemanticQueryCache(
+            threshold=settings.semantic_cache_threshold,
+            ttl_seconds=settings.semantic_cache_ttl_seconds
+        )
+        self.exact_cache = ExactQueryCache(ttl_seconds=settings.semantic_cache_ttl_seconds)
+        self.search_cache = ToolResultCache(
+            threshold=SEARCH_CACHE_THRESHOLD,
+            ttl_seconds=TOOL_CACHE_TTL_SECONDS
+        )
+
+        self.system_prompt = SYSTEM_PROMPT
+
+        # The MCP server and agent options are shared by every turn's client
+        legal_tools_server = create_sdk_mcp_server(
+            name="legal",
+            version="1.0.0",
+            tools=[
+                self._create_rag_tool(),
+                self._create_web_search_tool(),
+                self._create_document_generation_tool()
+            ]
+        )
+        self.agent_options = ClaudeAgentOptions(
+            system_prompt=self.system_prompt,
+            mcp_servers={"legal": legal_tools_server},
+            allowed_tools=self.ALLOWED_TOOLS,
+            model=self.model,
+            permission_mode="bypassPermissions"  # Auto-execute our custom tools
+        )
+
+    def _search_library(
+        self,
+        query_embedding: List[float],
+        limit: int
+    ) -> tuple[List[tuple], Dict[int, Any]]:
+        """
+        Run the blocking part of a document search
+
+        Runs in a worker thread with its own database session: the SDK runs
+        tool calls concurrently, and the turn's session is not thread-safe.
+
+        Args:
+            query_embedding: Query vector
+            limit: Maximum number of chunks to return
+
+        Returns:
+            Tuple of ((chunk, score) results, title rows keyed by document ID)
+        """
+        db = SessionLocal()
+        try:
+            return self._query_library(db, query_embedding, limit)
+        finally:
+            db.close()
+
+    def _query_library(
+        self,
+        db: Session,
+        query_embedding: List[float],
+        limit: int
+    ) -> tuple[List[tuple], Dict[int, Any]]:
+        """
+        Find the chunks closest to a query and their documents' titles
+
+        Args:
+            db: Database session
+            query_embedding: Query vector
+            limit: Maximum number of chunks to return
+
+        Returns:
+            Tuple of ((chunk, score) results, title rows keyed by document ID)
+        """
+        results = self.embedding_service.search_similar_chunks(
+            db=db,
+            query_embedding=query_embedding,
+            limit=limit,
+            min_score=0.3,  # Lowered threshold for better recall
+            load_embeddings=False  # Results are formatted from content only
+        )
+        if not results:
+            return [], {}
+
+        # Load the titles of all parent documents in one column-only query
+        doc_ids = {chunk.document_id for chunk, _ in results}
+        documents = {
+            row.id: row
+            for row in db.query(
+                Document.id,
+                Document.original_filename,
+                Document.filename
+            ).filter(Document.id.in_(doc_ids)).all()
+        }
+
+        return results, documents
+
+    def _create_rag_tool(self):
+        """Create a RAG document search tool that reads the calling session's tool context."""
 
         @tool(
             "search_documents",
@@ -85,17 +306,27 @@ When responding:
         )
         async def search_documents(args: Dict[str, Any]) -> Dict[str, Any]:
             """Search for relevant documents using RAG."""
+            context = current_tool_context.get()
             try:
                 query = args.get("query", "")
                 limit = args.get("limit", 5)
                 
-                print(f"[RAG TOOL] Searching for: {query}")
+                logger.debug("search_documents query: %s", query)
 
-                # Generate query embedding
-                query_embedding = self.embedding_service.generate_query_embedding(query)
+                cached = self.search_cache.lookup(limit, query)
+                if cached:
+                    return cached
+
+                # Reuse the turn's embedding when searching for the user's own message
+                if query == context.user_message and context.query_embedding:
+                    query_embedding = context.query_embedding
+                else:
+                    query_embedding = await asyncio.to_thread(
+                        self.embedding_service.generate_query_embedding, query
+                    )
 
                 if not query_embedding:
-                    print(f"[RAG TOOL] Failed to generate embedding")
+                    logger.warning("search_documents could not embed query: %s", query)
                     return {
                         "content": [{
                             "type": "text",
@@ -104,20 +335,23 @@ When responding:
                         "is_error": True
                     }
 
-                # Search for similar chunks
-                results = self.embedding_service.search_similar_chunks(
-                    db=db,
-                    query_embedding=query_embedding,
-                    limit=limit,
-                    min_score=0.3  # Lowered threshold for better recall
+                cached = self.search_cache.lookup(limit, query, query_embedding)
+                if cached:
+                    logger.debug("search_documents reused cached results for a similar query")
+                    return cached
+
+                # Search in a worker thread so the event loop stays free for
+                # tool calls Claude issues alongside this one (e.g. web search)
+                results, documents = await asyncio.to_thread(
+                    self._search_library, query_embedding, limit
+                )
+
+                logger.debug(
+                    "search_documents found %d results (top score %.4f)",
+                    len(results), results[0][1] if results else 0.0
                 )
-                
-                print(f"[RAG TOOL] Found {len(results)} results with min_score=0.3")
-                if results:
-                    print(f"[RAG TOOL] Top score: {results[0][1]:.4f}")
 
                 if not results:
-                    print(f"[RAG TOOL] No results found - returning message")
                     return {
                         "content": [{
                             "type": "text",
@@ -128,9 +362,7 @@ When responding:
                 # Format results
                 formatted_results = []
                 for chunk, score in results:
-                    document = db.query(Document).filter(
-                        Document.id == chunk.document_id
-                    ).first()
+                    document = documents.get(chunk.document_id)
 
                     if document:
                         formatted_results.append({
@@ -143,24 +375,28 @@ When responding:
 
                 # Build response text with FULL content (not truncated)
                 # Include a JSON block at the end that we can parse for citations
-                response_text = f"Found {len(formatted_results)} relevant documents:\n\n"
+                parts = [f"Found {len(formatted_results)} relevant documents:\n\n"]
                 for i, doc in enumerate(formatted_results, 1):
-                    response_text += f"[{i}] {doc['document_title']}"
-                    if doc['page_number']:
-                        response_text += f" (Page {doc['page_number']})"
-                    response_text += f"\nRelevance: {doc['relevance_score']:.2f}\n"
-                    response_text += f"Content:\n{doc['content']}\n\n---\n\n"
-                
+                    page = f" (Page {doc['page_number']})" if doc['page_number'] else ""
+                    parts.append(
+                        f"[{i}] {doc['document_title']}{page}\n"
+                        f"Relevance: {doc['relevance_score']:.2f}\n"
+                        f"Content:\n{doc['content']}\n\n---\n\n"
+                    )
+
                 # Add citations marker for extraction
-                citations_json = json.dumps(formatted_results)
-                response_text += f"\n\n__CITATIONS_START__{citations_json}__CITATIONS_END__\n"
+                citations_json = orjson.dumps(formatted_results).decode()
+                parts.append(f"\n\n{CITATIONS_START}{citations_json}{CITATIONS_END}\n")
+                response_text = "".join(parts)
 
-                return {
+                response = {
                     "content": [{
                         "type": "text",
                         "text": response_text
                     }]
                 }
+                self.search_cache.put(limit, query, response, query_embedding)
+                return response
 
             except Exception as e:
                 return {
@@ -194,8 +430,17 @@ When responding:
                 query = args.get("query", "")
                 limit = args.get("limit", 3)
 
+                # WebSearchService caches results by query text and, given an
+                # embedding, by similarity. Only the turn's own embedding is
+                # passed: embedding a rewritten query would cost a Voyage call
+                # just to probe the cache
+                context = current_tool_context.get()
+                query_embedding = context.query_embedding if query == context.user_message else None
+
                 # Perform web search
-                results = await self.web_search.search_kentucky_statutes(query, limit)
+                results = await self.web_search.search_kentucky_statutes(
+                    query, limit, query_embedding=query_embedding
+                )
 
                 if not results:
                     return {
@@ -206,15 +451,13 @@ When responding:
                     }
 
                 # Format results
-                response_text = f"Web Search Results for '{query}':\n\n"
+                parts = [f"Web Search Results for '{query}':\n\n"]
                 for i, result in enumerate(results, 1):
-                    response_text += f"[{i}] {result['title']}\n"
-                    response_text += f"URL: {result['url']}\n"
-                    if result.get('snippet'):
-                        response_text += f"Summary: {result['snippet']}\n"
-                    response_text += "\n"
+                    summary = f"Summary: {result['snippet']}\n" if result.get('snippet') else ""
+                    parts.append(f"[{i}] {result['title']}\nURL: {result['url']}\n{summary}\n")
 
-                response_text += "\nNote: Please verify these web sources and cite URLs when referencing."
+                parts.append("\nNote: Please verify these web sources and cite URLs when referencing.")
+                response_text = "".join(parts)
 
                 return {
                     "content": [{
@@ -234,8 +477,8 @@ When responding:
 
         return search_kentucky_statutes
 
-    def _create_document_generation_tool(self, db: Session, user_id: int, session_id: int):
-        """Create a document generation tool."""
+    def _create_document_generation_tool(self):
+        """Create a document generation tool that reads the calling session's tool context."""
 
         @tool(
             "generate_document",
@@ -266,33 +509,42 @@ When responding:
         )
         async def generate_document(args: Dict[str, Any]) -> Dict[str, Any]:
             """Generate a legal document from template."""
+            context = current_tool_context.get()
+            db = context.db
             try:
                 template_type = args.get("template_type")
                 format_type = args.get("format", "docx")
                 
-                print(f"[DOC GEN TOOL] Generating {template_type} as {format_type}")
+                logger.debug("generate_document rendering %s as %s", template_type, format_type)
                 
+                attendees = args.get("attendees") or ""
+
                 # Prepare data dict from args
                 data = {
                     "company": "Atlas Machine and Supply, Inc.",
                     "title": args.get("title", ""),
                     "date": args.get("meeting_date", ""),
                     "resolution_text": args.get("resolution_text", ""),
-                    "attendees": args.get("attendees", "").split(",") if args.get("attendees") else [],
+                    "attendees": [name.strip() for name in attendees.split(",") if name.strip()],
                     "location": args.get("meeting_location", ""),
                     "actions": args.get("actions", ""),
                 }
                 
-                # Generate the document
-                doc_content = self.doc_generator.generate_document(
-                    template_type=template_type,
-                    data=data,
-                    format=format_type
-                )
-                
-                # Save to storage
+                # Render straight into storage off the event loop so other
+                # sessions keep streaming
                 filename = f"{template_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{format_type}"
-                file_path = self.doc_service._save_file(doc_content, filename, filename)
+                file_path, file_size = await asyncio.to_thread(
+                    self.doc_service.save_generated_file,
+                    lambda sink: self.doc_generator.generate_document(
+                        template_type=template_type,
+                        data=data,
+                        format=format_type,
+                        sink=sink
+                    ),
+                    filename,
+                    filename
+                )
+                context.generated_files.append(file_path)
                 
                 # Create document record in database
                 document = Document(
@@ -300,26 +552,28 @@ When responding:
                     original_filename=args.get("title", filename),
                     file_path=file_path,
                     file_type=format_type,
-                    file_size=len(doc_content),
+                    file_size=file_size,
                     mime_type=f"application/{'vnd.openxmlformats-officedocument.wordprocessingml.document' if format_type == 'docx' else 'pdf'}",
-                    owner_id=user_id
+                    owner_id=context.user_id
                 )
                 db.add(document)
-                db.commit()
-                db.refresh(document)
-                
+                # The flush fills in the ID from INSERT ... RETURNING; the row is
+                # committed with the rest of the turn by the caller
+                db.flush()
+                document_id = document.id
+
                 # Link to chat message
-                print(f"[DOC GEN TOOL] Document created with ID: {document.id}")
+                logger.debug("generate_document created document %d", document_id)
                 
                 return {
                     "content": [{
                         "type": "text",
-                        "text": f"Document generated successfully!\n\nDocument ID: {document.id}\nFilename: {filename}\nType: {self.doc_generator.TEMPLATE_TYPES[template_type]}\nFormat: {format_type.upper()}\n\nThe document has been saved and can be downloaded from the Documents page."
+                        "text": f"Document generated successfully!\n\nDocument ID: {document_id}\nFilename: {filename}\nType: {self.doc_generator.TEMPLATE_TYPES[template_type]}\nFormat: {format_type.upper()}\n\nThe document has been saved and can be downloaded from the Documents page."
                     }]
                 }
 
             except Exception as e:
-                print(f"[DOC GEN TOOL] Error: {str(e)}")
+                logger.exception("generate_document failed")
                 return {
                     "content": [{
                         "type": "text",
@@ -366,6 +620,9 @@ When responding:
         """
         Get a chat session by ID
 
+        Found sessions are memoized on the request's db session, so repeated
+        ownership checks within one request cost a dict lookup.
+
         Args:
             db: Database session
             session_id: Session ID
@@ -374,10 +631,19 @@ When responding:
         Returns:
             ChatSession or None if not found
         """
-        return db.query(ChatSession).filter(
+        cache = db.info.setdefault(SESSION_CACHE_KEY, {})
+        session = cache.get((session_id, user_id))
+        if session is not None:
+            return session
+
+        session = db.query(ChatSession).filter(
             ChatSession.id == session_id,
             ChatSession.user_id == user_id
         ).first()
+        if session is not None:
+            cache[(session_id, user_id)] = session
+
+        return session
 
     def list_sessions(
         self,
@@ -398,16 +664,25 @@ When responding:
         Returns:
             Tuple of (List of ChatSessions, total count)
         """
-        query = db.query(ChatSession).filter(
+        # Fetch the page and the total in one round-trip via COUNT(*) OVER ()
+        rows = db.query(
+            ChatSession,
+            func.count().over().label("total")
+        ).filter(
             ChatSession.user_id == user_id
-        )
-
-        total = query.count()
-        sessions = query.order_by(
+        ).order_by(
             ChatSession.created_at.desc()
         ).offset(skip).limit(limit).all()
 
-        return sessions, total
+        if rows:
+            return [row[0] for row in rows], rows[0].total
+
+        # Page is past the end (or user has no sessions): no row carries the total
+        total = db.query(ChatSession).filter(
+            ChatSession.user_id == user_id
+        ).count() if skip else 0
+
+        return [], total
 
     def delete_session(
         self,
@@ -426,23 +701,16 @@ When responding:
         Returns:
             True if deleted, False if not found
         """
-        session = db.query(ChatSession).filter(
+        # One DELETE without a pre-SELECT; messages are removed by the
+        # ON DELETE CASCADE on chat_messages.session_id
+        deleted = db.query(ChatSession).filter(
             ChatSession.id == session_id,
             ChatSession.user_id == user_id
-        ).first()
-
-        if not session:
-            return False
-
-        # Delete all messages in the session
-        db.query(ChatMessage).filter(
-            ChatMessage.session_id == session_id
-        ).delete()
-
-        db.delete(session)
+        ).delete(synchronize_session=False)
+        db.info.get(SESSION_CACHE_KEY, {}).pop((session_id, user_id), None)
         db.commit()
 
-        return True
+        return deleted > 0
 
     def get_messages(
         self,
@@ -461,14 +729,76 @@ When responding:
         Returns:
             List of ChatMessages
         """
-        # Verify user owns the session
-        session = self.get_session(db, session_id, user_id)
-        if not session:
-            return []
+        # Ownership is enforced by the join, so no separate session lookup.
+        # A turn's two messages share the transaction's now(); id keeps their order
+        return db.query(ChatMessage).join(
+            ChatSession, ChatSession.id == ChatMessage.session_id
+        ).filter(
+            ChatMessage.session_id == session_id,
+            ChatSession.user_id == user_id
+        ).order_by(ChatMessage.created_at, ChatMessage.id).all()
+
+    def _turn_context_key(self, db: Session, session_id: int) -> Optional[str]:
+        """
+        Identify the conversation state a new message is asked in
+
+        Follow-up questions depend on the previous reply, so semantic cache
+        entries are scoped to it; opening questions share the None key.
+
+        Args:
+            db: Database session
+            session_id: Session ID
+
+        Returns:
+            Hash of the session's latest assistant reply, or None on the first turn
+        """
+        last_reply = db.query(ChatMessage.content).filter(
+            ChatMessage.session_id == session_id,
+            ChatMessage.role == "assistant"
+        ).order_by(
+            ChatMessage.created_at.desc(), ChatMessage.id.desc()
+        ).limit(1).scalar()
+
+        if last_reply is None:
+            return None
+        return hashlib.sha1(last_reply.encode("utf-8")).hexdigest()
+
+    @asynccontextmanager
+    async def _turn_client(self, context: ToolContext) -> AsyncIterator[ClaudeSDKClient]:
+        """
+        Connect an SDK client for one turn
+
+        The client is connected and disconnected in the calling task, as the
+        SDK requires; only the agent options and MCP server are shared.
+
+        Args:
+            context: State the tools should use for this turn
 
-        return db.query(ChatMessage).filter(
-            ChatMessage.session_id == session_id
-        ).order_by(ChatMessage.created_at).all()
+        Yields:
+            Connected ClaudeSDKClient
+        """
+        # Set the context before connecting so the client's reader task,
+        # which runs the tool handlers, inherits it
+        token = current_tool_context.set(context)
+        try:
+            async with ClaudeSDKClient(options=self.agent_options) as client:
+                yield client
+        finally:
+            current_tool_context.reset(token)
+
+    def _add_user_message(self, db: Session, session_id: int, user_message: str) -> None:
+        """Add a turn's user message, right before it is committed with the reply"""
+        db.add(ChatMessage(
+            session_id=session_id,
+            role="user",
+            content=user_message
+        ))
+
+    def _remove_generated_files(self, context: ToolContext) -> None:
+        """Delete files generated during a turn whose records were rolled back"""
+        for file_path in context.generated_files:
+            self.doc_service.delete_file(file_path)
+        context.generated_files.clear()
 
     async def stream_chat_response(
         self,
@@ -476,7 +806,7 @@ When responding:
         session_id: int,
         user_id: int,
         user_message: str
-    ) -> AsyncGenerator[str, None]:
+    ) -> AsyncGenerator[bytes, None]:
         """
         Stream chat response using Claude Agent SDK with custom RAG and web search tools.
 
@@ -487,58 +817,70 @@ When responding:
             user_message: User's message
 
         Yields:
-            Server-Sent Events formatted strings
+            Server-Sent Events frames as bytes
         """
-        # Verify session ownership
-        session = self.get_session(db, session_id, user_id)
-        if not session:
-            yield f"data: {json.dumps({'type': 'error', 'error': 'Session not found'})}\n\n"
+        # Verify session ownership (usually already memoized by the API layer)
+        if not self.get_session(db, session_id, user_id):
+            yield sse_event({'type': 'error', 'error': 'Session not found'})
             return
 
-        # Save user message
-        user_msg = ChatMessage(
-            session_id=session_id,
-            role="user",
-            content=user_message
-        )
-        db.add(user_msg)
-        db.commit()
+        # Repeats of a question at the same point of this session are answered
+        # without embedding
+        query_embedding = None
+        with db.no_autoflush:
+            context_key = self._turn_context_key(db, session_id)
 
-        # Yield control
-        await asyncio.sleep(0)
+        # End the read transaction so no pooled connection sits idle while the
+        # reply is generated; the user message and reply are added and
+        # committed together once the reply is complete
+        db.commit()
 
-        # Create custom tools with database session bound
-        rag_tool = self._create_rag_tool(db)
-        web_tool = self._create_web_search_tool()
-        doc_gen_tool = self._create_document_generation_tool(db, user_id, session_id)
+        cached = self.exact_cache.lookup(session_id, user_message, context_key)
+        if not cached:
+            # Embed in a worker thread; the embedding serves both the semantic
+            # cache lookup and the first search_documents call
+            query_embedding = await asyncio.to_thread(
+                self.embedding_service.generate_query_embedding, user_message
+            )
+            cached = self.query_cache.lookup(
+                user_id, user_message, query_embedding, context_key
+            ) if query_embedding else None
+        if cached:
+            # Citations and reply go out as one write
+            yield b"".join(
+                [sse_citation(citation) for citation in cached.citations]
+                + [sse_content(cached.content)]
+            )
 
-        # Create SDK MCP server with custom tools
-        legal_tools_server = create_sdk_mcp_server(
-            name="legal",
-            version="1.0.0",
-            tools=[rag_tool, web_tool, doc_gen_tool]
-        )
+            self._add_user_message(db, session_id, user_message)
+            assistant_msg = ChatMessage(
+                session_id=session_id,
+                role="assistant",
+                content=cached.content,
+                citations=cached.citations or None,
+                generated_document_id=cached.generated_document_id
+            )
+            db.add(assistant_msg)
+            await asyncio.to_thread(db.commit)
 
-        # Configure SDK options
-        options = ClaudeAgentOptions(
-            system_prompt=self.system_prompt,
-            mcp_servers={"legal": legal_tools_server},
-            allowed_tools=[
-                "mcp__legal__search_documents",
-                "mcp__legal__search_kentucky_statutes",
-                "mcp__legal__generate_document"
-            ],
-            model=self.model,
-            permission_mode="bypassPermissions"  # Auto-execute our custom tools
-        )
+            yield DONE_FRAME
+            return
 
-        assistant_content = ""
+        content_parts = []
         citations = []
         generated_document_id = None
+        citation_parser = CitationStreamParser()
+        context = ToolContext(
+            db=db,
+            user_id=user_id,
+            session_id=session_id,
+            user_message=user_message,
+            query_embedding=query_embedding
+        )
+        committed = False
 
         try:
-            # Use ClaudeSDKClient for the conversation
-            async with ClaudeSDKClient(options=options) as client:
+            async with self._turn_client(context) as client:
                 # Send the user's message with explicit instruction to use tools
                 enhanced_message = f"{user_message}\n\n(Remember to search the uploaded documents using the search_documents tool before providing a response.)"
                 await client.query(enhanced_message)
@@ -546,61 +888,66 @@ When responding:
                 # Stream the response
                 async for message in client.receive_response():
                     if isinstance(message, AssistantMessage):
+                        # Frames for all blocks of a message go out as one write
+                        frames = []
                         for block in message.content:
                             if isinstance(block, TextBlock):
                                 # Extract citations and document IDs from text if present
                                 text = block.text
                                 
                                 # Check for generated document ID
-                                if "Document ID:" in text:
-                                    try:
-                                        import re
-                                        match = re.search(r'Document ID:\s*(\d+)', text)
-                                        if match:
-                                            generated_document_id = int(match.group(1))
-                                    except:
-                                        pass
+                                match = DOCUMENT_ID_PATTERN.search(text)
+                                if match:
+                                    generated_document_id = int(match.group(1))
                                 
-                                if "__CITATIONS_START__" in text and "__CITATIONS_END__" in text:
-                                    # Split text and citations
-                                    parts = text.split("__CITATIONS_START__")
-                                    visible_text = parts[0]
-                                    citation_part = parts[1].split("__CITATIONS_END__")[0]
-                                    
+                                visible_text, payloads = citation_parser.feed(text)
+
+                                for payload in payloads:
                                     try:
                                         # Parse citations JSON
-                                        tool_citations = json.loads(citation_part)
-                                        # Emit citations
-                                        for citation in tool_citations:
-                                            formatted_citation = {
+                                        tool_citations = [
+                                            {
                                                 "document_id": citation["document_id"],
                                                 "document_title": citation["document_title"],
                                                 "chunk_index": citation.get("document_id", 0),  # Use doc_id as fallback
                                                 "page_number": citation.get("page_number"),
                                                 "relevance_score": citation["relevance_score"]
                                             }
-                                            citations.append(formatted_citation)
-                                            yield f"data: {json.dumps({'type': 'citation', 'citation': formatted_citation})}\n\n"
-                                    except:
-                                        visible_text = text  # If parsing fails, show all text
-                                    
-                                    # Stream only the visible text (without citation markers)
-                                    assistant_content += visible_text
-                                    yield f"data: {json.dumps({'type': 'content', 'content': visible_text})}\n\n"
-                                else:
-                                    # No citations in this block, stream normally
-                                    assistant_content += text
-                                    yield f"data: {json.dumps({'type': 'content', 'content': text})}\n\n"
+                                            for citation in orjson.loads(payload)
+                                        ]
+                                    except (ValueError, KeyError, TypeError) as e:
+                                        logger.warning("Failed to parse citations: %s", e)
+                                        continue
+
+                                    citations.extend(tool_citations)
+                                    frames.extend(sse_citation(citation) for citation in tool_citations)
+
+                                # Stream only the visible text (without citation markers)
+                                if visible_text:
+                                    content_parts.append(visible_text)
+                                    frames.append(sse_content(visible_text))
 
                             elif isinstance(block, ToolUseBlock):
                                 # Tool is being used - could yield status if needed
                                 pass
 
+                        if frames:
+                            yield b"".join(frames)
+
                     elif isinstance(message, ResultMessage):
                         # Final result - conversation complete
                         break
 
-            # Save assistant message
+            # Release text held back as a possible partial marker
+            trailing_text = citation_parser.flush()
+            if trailing_text:
+                content_parts.append(trailing_text)
+                yield sse_content(trailing_text)
+
+            assistant_content = "".join(content_parts)
+
+            # Save the user message and the assistant reply
+            self._add_user_message(db, session_id, user_message)
             assistant_msg = ChatMessage(
                 session_id=session_id,
                 role="assistant",
@@ -609,15 +956,37 @@ When responding:
                 generated_document_id=generated_document_id
             )
             db.add(assistant_msg)
-            db.commit()
+            # Commit the turn (user message, reply and any generated document)
+            # off the event loop
+            await asyncio.to_thread(db.commit)
+            committed = True
+
+            # Turns that generated a document are not cached: replaying them
+            # would point at the earlier document instead of creating a new one
+            if generated_document_id is None:
+                self.exact_cache.put(
+                    session_id, user_message, assistant_content, citations,
+                    context_key=context_key
+                )
+                if query_embedding:
+                    self.query_cache.put(
+                        user_id, user_message, query_embedding, assistant_content, citations,
+                        context_key=context_key
+                    )
 
             # Send completion event
-            yield f"data: {json.dumps({'type': 'done'})}\n\n"
+            yield DONE_FRAME
 
         except Exception as e:
+            db.rollback()
             error_msg = f"Error in chat response: {str(e)}"
-            print(error_msg)
-            yield f"data: {json.dumps({'type': 'error', 'error': error_msg})}\n\n"
+            logger.exception("Error in chat response")
+            yield sse_event({'type': 'error', 'error': error_msg})
+
+        finally:
+            # Also covers a client disconnect, where the session closes uncommitted
+            if not committed:
+                self._remove_generated_files(context)
 
     async def generate_non_streaming_response(
         self,
@@ -643,47 +1012,58 @@ When responding:
         if not session:
             return {"error": "Session not found"}
 
-        # Save user message
-        user_msg = ChatMessage(
-            session_id=session_id,
-            role="user",
-            content=user_message
-        )
-        db.add(user_msg)
-        db.commit()
+        # Repeats of a question at the same point of this session are answered
+        # without embedding
+        query_embedding = None
+        with db.no_autoflush:
+            context_key = self._turn_context_key(db, session_id)
 
-        # Create custom tools with database session bound
-        rag_tool = self._create_rag_tool(db)
-        web_tool = self._create_web_search_tool()
-        doc_gen_tool = self._create_document_generation_tool(db, user_id, session_id)
+        # End the read transaction so no pooled connection sits idle while the
+        # reply is generated; the user message and reply are added and
+        # committed together once the reply is complete
+        db.commit()
 
-        # Create SDK MCP server with custom tools
-        legal_tools_server = create_sdk_mcp_server(
-            name="legal",
-            version="1.0.0",
-            tools=[rag_tool, web_tool, doc_gen_tool]
-        )
+        cached = self.exact_cache.lookup(session_id, user_message, context_key)
+        if not cached:
+            query_embedding = await asyncio.to_thread(
+                self.embedding_service.generate_query_embedding, user_message
+            )
+            cached = self.query_cache.lookup(
+                user_id, user_message, query_embedding, context_key
+            ) if query_embedding else None
+        if cached:
+            self._add_user_message(db, session_id, user_message)
+            assistant_msg = ChatMessage(
+                session_id=session_id,
+                role="assistant",
+                content=cached.content,
+                citations=cached.citations or None,
+                generated_document_id=cached.generated_document_id
+            )
+            db.add(assistant_msg)
+            session.updated_at = func.now()
+            await asyncio.to_thread(db.commit)
 
-        # Configure SDK options
-        options = ClaudeAgentOptions(
-            system_prompt=self.system_prompt,
-            mcp_servers={"legal": legal_tools_server},
-            allowed_tools=[
-                "mcp__legal__search_documents",
-                "mcp__legal__search_kentucky_statutes",
-                "mcp__legal__generate_document"
-            ],
-            model=self.model,
-            permission_mode="bypassPermissions"
-        )
+            return {
+                "message": cached.content,
+                "citations": cached.citations
+            }
 
-        assistant_content = ""
+        content_parts = []
         citations = []
         generated_document_id = None
+        citation_parser = CitationStreamParser()
+        context = ToolContext(
+            db=db,
+            user_id=user_id,
+            session_id=session_id,
+            user_message=user_message,
+            query_embedding=query_embedding
+        )
+        committed = False
 
         try:
-            # Use ClaudeSDKClient for the conversation
-            async with ClaudeSDKClient(options=options) as client:
+            async with self._turn_client(context) as client:
                 # Send the user's message with explicit instruction to use tools
                 enhanced_message = f"{user_message}\n\n(Remember to search the uploaded documents using the search_documents tool before providing a response.)"
                 await client.query(enhanced_message)
@@ -696,23 +1076,16 @@ When responding:
                                 text = block.text
                                 
                                 # Check for generated document ID
-                                if "Document ID:" in text:
-                                    try:
-                                        import re
-                                        match = re.search(r'Document ID:\s*(\d+)', text)
-                                        if match:
-                                            generated_document_id = int(match.group(1))
-                                    except:
-                                        pass
+                                match = DOCUMENT_ID_PATTERN.search(text)
+                                if match:
+                                    generated_document_id = int(match.group(1))
                                 
                                 # Extract citations if present
-                                if "__CITATIONS_START__" in text and "__CITATIONS_END__" in text:
-                                    parts = text.split("__CITATIONS_START__")
-                                    visible_text = parts[0]
-                                    citation_part = parts[1].split("__CITATIONS_END__")[0]
-                                    
+                                visible_text, payloads = citation_parser.feed(text)
+
+                                for payload in payloads:
                                     try:
-                                        tool_citations = json.loads(citation_part)
+                                        tool_citations = orjson.loads(payload)
                                         for citation in tool_citations:
                                             citations.append({
                                                 "document_id": citation["document_id"],
@@ -721,17 +1094,20 @@ When responding:
                                                 "page_number": citation.get("page_number"),
                                                 "relevance_score": citation["relevance_score"]
                                             })
-                                        assistant_content += visible_text
-                                    except:
-                                        assistant_content += text
-                                else:
-                                    assistant_content += text
+                                    except (ValueError, KeyError, TypeError) as e:
+                                        logger.warning("Failed to parse citations: %s", e)
+
+                                content_parts.append(visible_text)
 
                     elif isinstance(message, ResultMessage):
                         # Final result - conversation complete
                         break
 
-            # Save assistant message
+            content_parts.append(citation_parser.flush())
+            assistant_content = "".join(content_parts)
+
+            # Save the user message and the assistant reply
+            self._add_user_message(db, session_id, user_message)
             assistant_msg = ChatMessage(
                 session_id=session_id,
                 role="assistant",
@@ -742,8 +1118,20 @@ When responding:
             db.add(assistant_msg)
 
             # Update session timestamp
-            session.updated_at = assistant_msg.created_at
-            db.commit()
+            session.updated_at = func.now()
+            await asyncio.to_thread(db.commit)
+            committed = True
+
+            if generated_document_id is None:
+                self.exact_cache.put(
+                    session_id, user_message, assistant_content, citations,
+                    context_key=context_key
+                )
+                if query_embedding:
+                    self.query_cache.put(
+                        user_id, user_message, query_embedding, assistant_content, citations,
+                        context_key=context_key
+                    )
 
             return {
                 "message": assistant_content,
@@ -751,6 +1139,11 @@ When responding:
             }
 
         except Exception as e:
+            db.rollback()
             error_msg = f"Error generating response: {str(e)}"
-            print(error_msg)
+            logger.exception("Error generating response")
             return {"error": error_msg}
+
+        finally:
+            if not committed:
+                self._remove_generated_files(context)
@@ -2,11 +2,20 @@
 Document generation service for creating legal documents from templates.
 """
 
+from collections import OrderedDict
 from datetime import datetime
-from typing import Dict, Any, Optional
+from functools import lru_cache
+from typing import Dict, Any, Optional, BinaryIO
 from pathlib import Path
+from xml.sax.saxutils import escape
+import hashlib
 import io
+import threading
+import zipfile
+import orjson
 from docx import Document
+from docx.oxml import parse_xml
+from docx.oxml.ns import qn
 from docx.shared import Pt, Inches
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from reportlab.lib.pagesizes import letter
@@ -15,6 +24,140 @@ from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
 from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY, TA_LEFT
 
+# Fast non-cryptographic hashing for generation cache keys
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+
+DEFAULT_COMPANY = "Atlas Machine and Supply, Inc."
+DATE_FORMAT = "%B %d, %Y"
+SIGNATURE_LINE = "_" * 40
+CERTIFICATION_HEADING = "CERTIFICATION"
+CORPORATE_SECRETARY = "Corporate Secretary"
+# Signature block repeated for every director on a consent action
+DIRECTOR_SIGNATURE_TEMPLATE = f"\n_{SIGNATURE_LINE}\n{{}}\nDirector\nDate: _____________\n"
+
+# Rendered documents keyed by a hash of their inputs (least recently used evicted first)
+GENERATION_CACHE_SIZE = 256
+_generation_cache: "OrderedDict[str, bytes]" = OrderedDict()
+_generation_cache_lock = threading.Lock()
+
+# Static package parts for the direct DOCX writer (headings and paragraphs only)
+DOCX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '<Override PartName="/word/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>'
+    '</Types>'
+)
+
+DOCX_PACKAGE_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '</Relationships>'
+)
+
+DOCX_DOCUMENT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+# Times New Roman 12pt body with the Title/Heading 2/Heading 3 styles the templates use
+DOCX_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<w:styles xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+    '<w:docDefaults><w:rPrDefault><w:rPr>'
+    '<w:rFonts w:ascii="Times New Roman" w:hAnsi="Times New Roman" w:cs="Times New Roman"/>'
+    '<w:sz w:val="24"/><w:szCs w:val="24"/>'
+    '</w:rPr></w:rPrDefault></w:docDefaults>'
+    '<w:style w:type="paragraph" w:default="1" w:styleId="Normal">'
+    '<w:name w:val="Normal"/><w:qFormat/></w:style>'
+    '<w:style w:type="paragraph" w:styleId="Title">'
+    '<w:name w:val="Title"/><w:basedOn w:val="Normal"/><w:next w:val="Normal"/><w:qFormat/>'
+    '<w:pPr><w:spacing w:after="300"/></w:pPr>'
+    '<w:rPr><w:b/><w:sz w:val="52"/><w:szCs w:val="52"/></w:rPr></w:style>'
+    '<w:style w:type="paragraph" w:styleId="Heading2">'
+    '<w:name w:val="heading 2"/><w:basedOn w:val="Normal"/><w:next w:val="Normal"/><w:qFormat/>'
+    '<w:pPr><w:keepNext/><w:spacing w:before="200"/><w:outlineLvl w:val="1"/></w:pPr>'
+    '<w:rPr><w:b/><w:sz w:val="26"/><w:szCs w:val="26"/></w:rPr></w:style>'
+    '<w:style w:type="paragraph" w:styleId="Heading3">'
+    '<w:name w:val="heading 3"/><w:basedOn w:val="Normal"/><w:next w:val="Normal"/><w:qFormat/>'
+    '<w:pPr><w:keepNext/><w:spacing w:before="200"/><w:outlineLvl w:val="2"/></w:pPr>'
+    '<w:rPr><w:b/></w:rPr></w:style>'
+    '</w:styles>'
+)
+
+# Encoded once so each document only compresses them
+DOCX_STATIC_PARTS = (
+    ("[Content_Types].xml", DOCX_CONTENT_TYPES.encode()),
+    ("_rels/.rels", DOCX_PACKAGE_RELS.encode()),
+    ("word/_rels/document.xml.rels", DOCX_DOCUMENT_RELS.encode()),
+    ("word/styles.xml", DOCX_STYLES.encode()),
+)
+
+DOCX_DOCUMENT_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+)
+
+# Wrapper used to parse a run of paragraphs in one go
+DOCX_FRAGMENT_START = '<w:body xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+DOCX_FRAGMENT_END = '</w:body>'
+
+# US Letter with 1" margins
+DOCX_DOCUMENT_END = (
+    '<w:sectPr><w:pgSz w:w="12240" w:h="15840"/>'
+    '<w:pgMar w:top="1440" w:right="1440" w:bottom="1440" w:left="1440" '
+    'w:header="720" w:footer="720" w:gutter="0"/></w:sectPr>'
+    '</w:body></w:document>'
+)
+
+
+def _docx_paragraph(text: str = "", style: Optional[str] = None, center: bool = False) -> str:
+    """
+    Render one WordprocessingML paragraph
+
+    Args:
+        text: Paragraph text; newlines become line breaks
+        style: Paragraph style ID (e.g. "Heading3"), None for Normal
+        center: Whether to center the paragraph
+
+    Returns:
+        <w:p> element markup
+    """
+    properties = ""
+    if style or center:
+        properties = (
+            "<w:pPr>"
+            + (f'<w:pStyle w:val="{style}"/>' if style else "")
+            + ('<w:jc w:val="center"/>' if center else "")
+            + "</w:pPr>"
+        )
+
+    if not text:
+        return f"<w:p>{properties}</w:p>"
+
+    runs = '</w:t><w:br/><w:t xml:space="preserve">'.join(escape(line) for line in text.split("\n"))
+    return f'<w:p>{properties}<w:r><w:t xml:space="preserve">{runs}</w:t></w:r></w:p>'
+
+
+def _document_date(data: Dict[str, Any]) -> str:
+    """Date to print on a document, defaulting to today"""
+    return data["date"] if "date" in data else datetime.now().strftime(DATE_FORMAT)
+
 
 class DocumentGenerator:
     """Service for generating legal documents from templates."""
@@ -26,16 +169,82 @@ class DocumentGenerator:
         "consent_action": "Action by Written Consent"
     }
 
-    def __init__(self):
+    # Required and optional fields per template type
+    TEMPLATE_FIELDS = {
+        "board_resolution": {
+            "required": ["resolution_title", "resolved_clauses"],
+            "optional": ["company", "resolution_number", "date", "whereas_clauses", "secretary_name"],
+            "fields": {
+                "company": {"type": "string", "description": "Company name"},
+                "resolution_number": {"type": "string", "description": "Resolution number/identifier"},
+                "date": {"type": "string", "description": "Date of resolution (MM/DD/YYYY)"},
+                "resolution_title": {"type": "string", "description": "Title of the resolution"},
+                "whereas_clauses": {"type": "array", "description": "List of WHEREAS clauses"},
+                "resolved_clauses": {"type": "array", "description": "List of RESOLVED clauses"},
+                "secretary_name": {"type": "string", "description": "Name of corporate secretary"}
+            }
+        },
+        "meeting_minutes": {
+            "required": ["attendees", "matters_discussed"],
+            "optional": ["company", "date", "time", "location", "absent", "guests", "chair",
+                        "minutes_approval", "resolutions", "adjournment_time", "secretary_name"],
+            "fields": {
+                "company": {"type": "string", "description": "Company name"},
+                "date": {"type": "string", "description": "Meeting date"},
+                "time": {"type": "string", "description": "Meeting start time"},
+                "location": {"type": "string", "description": "Meeting location"},
+                "attendees": {"type": "array", "description": "List of attendees"},
+                "absent": {"type": "array", "description": "List of absent members"},
+                "guests": {"type": "array", "description": "List of guests"},
+                "chair": {"type": "string", "description": "Meeting chair/president"},
+                "minutes_approval": {"type": "array", "description": "Minutes approval text"},
+                "matters_discussed": {"type": "array", "description": "List of matters discussed"},
+                "resolutions": {"type": "array", "description": "List of resolutions adopted"},
+                "adjournment_time": {"type": "string", "description": "Adjournment time"},
+                "secretary_name": {"type": "string", "description": "Name of corporate secretary"}
+            }
+        },
+        "notice": {
+            "required": ["meeting_date", "meeting_time", "meeting_location", "agenda_items"],
+            "optional": ["company", "date", "secretary_name"],
+            "fields": {
+                "company": {"type": "string", "description": "Company name"},
+                "date": {"type": "string", "description": "Notice date"},
+                "meeting_date": {"type": "string", "description": "Date of meeting"},
+                "meeting_time": {"type": "string", "description": "Time of meeting"},
+                "meeting_location": {"type": "string", "description": "Location of meeting"},
+                "agenda_items": {"type": "array", "description": "List of agenda items"},
+                "secretary_name": {"type": "string", "description": "Name of corporate secretary"}
+            }
+        },
+        "consent_action": {
+            "required": ["resolutions", "directors"],
+            "optional": ["company", "date"],
+            "fields": {
+                "company": {"type": "string", "description": "Company name"},
+                "date": {"type": "string", "description": "Effective date"},
+                "resolutions": {"type": "array", "description": "List of resolutions"},
+                "directors": {"type": "array", "description": "List of director names for signatures"}
+            }
+        }
+    }
+
+    def __init__(self, use_fast_docx: bool = True):
+        """
+        Args:
+            use_fast_docx: Write DOCX files directly instead of through python-docx
+        """
         self.templates_dir = Path(__file__).parent.parent / "templates"
         self.templates_dir.mkdir(exist_ok=True)
+        self.use_fast_docx = use_fast_docx
 
     def generate_document(
         self,
         template_type: str,
         data: Dict[str, Any],
-        format: str = "docx"
-    ) -> bytes:
+        format: str = "docx",
+        sink: Optional[BinaryIO] = None
+    ) -> Optional[bytes]:
         """
         Generate a document from a template.
 
@@ -43,9 +252,11 @@ class DocumentGenerator:
             template_type: Type of template (board_resolution, meeting_minutes, etc.)
             data: Dictionary containing template variables
             format: Output format (docx or pdf)
+            sink: Binary file-like object to write the document into; when
+                omitted the document is rendered in memory and returned
 
         Returns:
-            Document content as bytes
+            Document content as bytes, or None when written to sink
         """
         if template_type not in self.TEMPLATE_TYPES:
             raise ValueError(f"Unknown template type: {template_type}")
@@ -53,6 +264,18 @@ class DocumentGenerator:
         if format not in ["docx", "pdf"]:
             raise ValueError(f"Unsupported format: {format}")
 
+        cache_key = self._generation_cache_key(template_type, data, format)
+        if cache_key is not None:
+            with _generation_cache_lock:
+                cached = _generation_cache.get(cache_key)
+                if cached is not None:
+                    _generation_cache.move_to_end(cache_key)
+            if cached is not None:
+                if sink is None:
+                    return cached
+                sink.write(cached)
+                return None
+
         # Generate document based on template type
         if template_type == "board_resolution":
             content = self._generate_board_resolution(data)
@@ -65,40 +288,87 @@ class DocumentGenerator:
         else:
             raise ValueError(f"Template generation not implemented for: {template_type}")
 
+        # Cacheable documents are rendered in memory (they are tens of KB) so
+        # the bytes can be kept; others stream straight into the sink
+        buffer = io.BytesIO() if sink is None or cache_key is not None else None
+
         # Convert to requested format
         if format == "docx":
-            return self._generate_docx(content, data)
+            self._generate_docx(content, data, buffer or sink)
         else:  # pdf
-            return self._generate_pdf(content, data)
+            self._generate_pdf(content, data, buffer or sink)
+
+        if buffer is None:
+            return None
+
+        document_bytes = buffer.getvalue()
+
+        if cache_key is not None:
+            with _generation_cache_lock:
+                _generation_cache[cache_key] = document_bytes
+                while len(_generation_cache) > GENERATION_CACHE_SIZE:
+                    _generation_cache.popitem(last=False)
+
+        if sink is None:
+            return document_bytes
+        sink.write(document_bytes)
+        return None
+
+    def _generation_cache_key(self, template_type: str, data: Dict[str, Any], format: str) -> Optional[str]:
+        """
+        Hash the inputs that fully determine a rendered document.
+
+        Templates default the date to today, so documents without an explicit
+        date are not cached. Returns None for data that cannot be serialized.
+        """
+        if "date" not in data:
+            return None
+
+        try:
+            serialized = orjson.dumps(data, option=orjson.OPT_SORT_KEYS)
+        except TypeError:
+            return None
+
+        suffix = f"|{template_type}|{format}|{self.use_fast_docx}".encode()
+        if xxhash is not None:
+            return xxhash.xxh3_128_hexdigest(serialized + suffix)
+
+        digest = hashlib.blake2b(serialized, digest_size=16)
+        digest.update(suffix)
+        return digest.hexdigest()
 
     def _generate_board_resolution(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Generate content for board resolution."""
+        get = data.get
+        company = get("company", DEFAULT_COMPANY)
+        date = _document_date(data)
+
         return {
             "title": "BOARD RESOLUTION",
-            "company": data.get("company", "Atlas Machine and Supply, Inc."),
-            "resolution_number": data.get("resolution_number", ""),
-            "date": data.get("date", datetime.now().strftime("%B %d, %Y")),
+            "company": company,
+            "resolution_number": get("resolution_number", ""),
+            "date": date,
             "sections": [
                 {
                     "heading": "RESOLUTION",
-                    "content": data.get("resolution_title", "")
+                    "content": get("resolution_title", "")
                 },
                 {
                     "heading": "WHEREAS",
-                    "content": data.get("whereas_clauses", [])
+                    "content": get("whereas_clauses", [])
                 },
                 {
                     "heading": "NOW, THEREFORE, BE IT RESOLVED",
-                    "content": data.get("resolved_clauses", [])
+                    "content": get("resolved_clauses", [])
                 },
                 {
-                    "heading": "CERTIFICATION",
+                    "heading": CERTIFICATION_HEADING,
                     "content": [
-                        f"I hereby certify that the foregoing resolution was duly adopted by the Board of Directors of {data.get('company', 'Atlas Machine and Supply, Inc.')} on {data.get('date', datetime.now().strftime('%B %d, %Y'))}.",
+                        f"I hereby certify that the foregoing resolution was duly adopted by the Board of Directors of {company} on {date}.",
                         "",
-                        "_" * 40,
-                        data.get("secretary_name", "Secretary"),
-                        "Corporate Secretary"
+                        SIGNATURE_LINE,
+                        get("secretary_name", "Secretary"),
+                        CORPORATE_SECRETARY
                     ]
                 }
             ]
@@ -106,56 +376,61 @@ class DocumentGenerator:
 
     def _generate_meeting_minutes(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Generate content for board meeting minutes."""
+        get = data.get
+        date = _document_date(data)
+        time = get("time", "")
+        guests = get("guests")
+
         return {
             "title": "MINUTES OF BOARD OF DIRECTORS MEETING",
-            "company": data.get("company", "Atlas Machine and Supply, Inc."),
-            "date": data.get("date", datetime.now().strftime("%B %d, %Y")),
-            "time": data.get("time", ""),
-            "location": data.get("location", ""),
+            "company": get("company", DEFAULT_COMPANY),
+            "date": date,
+            "time": time,
+            "location": get("location", ""),
             "sections": [
                 {
                     "heading": "ATTENDANCE",
                     "content": [
-                        f"Present: {', '.join(data.get('attendees', []))}",
-                        f"Absent: {', '.join(data.get('absent', []))}",
-                        f"Also Present: {', '.join(data.get('guests', []))}" if data.get('guests') else ""
+                        f"Present: {', '.join(get('attendees', []))}",
+                        f"Absent: {', '.join(get('absent', []))}",
+                        f"Also Present: {', '.join(guests)}" if guests else ""
                     ]
                 },
                 {
                     "heading": "CALL TO ORDER",
                     "content": [
-                        f"The meeting was called to order at {data.get('time', '')} by {data.get('chair', 'the Chairman')}."
+                        f"The meeting was called to order at {time} by {get('chair', 'the Chairman')}."
                     ]
                 },
                 {
                     "heading": "APPROVAL OF MINUTES",
-                    "content": data.get("minutes_approval", [
+                    "content": get("minutes_approval", [
                         "The minutes of the previous meeting were reviewed and approved."
                     ])
                 },
                 {
                     "heading": "MATTERS DISCUSSED",
-                    "content": data.get("matters_discussed", [])
+                    "content": get("matters_discussed", [])
                 },
                 {
                     "heading": "RESOLUTIONS ADOPTED",
-                    "content": data.get("resolutions", [])
+                    "content": get("resolutions", [])
                 },
                 {
                     "heading": "ADJOURNMENT",
                     "content": [
-                        f"There being no further business, the meeting was adjourned at {data.get('adjournment_time', '')}."
+                        f"There being no further business, the meeting was adjourned at {get('adjournment_time', '')}."
                     ]
                 },
                 {
-                    "heading": "CERTIFICATION",
+                    "heading": CERTIFICATION_HEADING,
                     "content": [
                         "",
-                        "_" * 40,
-                        data.get("secretary_name", "Secretary"),
-                        "Corporate Secretary",
+                        SIGNATURE_LINE,
+                        get("secretary_name", "Secretary"),
+                        CORPORATE_SECRETARY,
                         "",
-                        f"Date: {data.get('date', datetime.now().strftime('%B %d, %Y'))}"
+                        f"Date: {date}"
                     ]
                 }
             ]
@@ -163,34 +438,38 @@ class DocumentGenerator:
 
     def _generate_notice(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Generate content for meeting notice."""
+        get = data.get
+        company = get("company", DEFAULT_COMPANY)
+
         return {
             "title": "NOTICE OF BOARD OF DIRECTORS MEETING",
-            "company": data.get("company", "Atlas Machine and Supply, Inc."),
+            "company": company,
             "sections": [
                 {
                     "heading": "TO",
-                    "content": [f"All Directors of {data.get('company', 'Atlas Machine and Supply, Inc.')}"]
+                    "content": [f"All Directors of {company}"]
                 },
                 {
                     "heading": "NOTICE IS HEREBY GIVEN",
                     "content": [
-                        f"A meeting of the Board of Directors will be held on:",
+                        "A meeting of the Board of Directors will be held on:",
                         "",
-                        f"Date: {data.get('meeting_date', '')}",
-                        f"Time: {data.get('meeting_time', '')}",
-                        f"Location: {data.get('meeting_location', '')}",
+                        f"Date: {get('meeting_date', '')}",
+                        f"Time: {get('meeting_time', '')}",
+                        f"Location: {get('meeting_location', '')}",
                         "",
                         "The purpose of the meeting is to consider and act upon the following matters:",
-                    ] + data.get("agenda_items", [])
+                        *get("agenda_items", [])
+                    ]
                 },
                 {
                     "heading": "",
                     "content": [
                         "",
-                        f"Dated: {data.get('date', datetime.now().strftime('%B %d, %Y'))}",
+                        f"Dated: {_document_date(data)}",
                         "",
-                        "_" * 40,
-                        data.get("secretary_name", "Corporate Secretary"),
+                        SIGNATURE_LINE,
+                        get("secretary_name", CORPORATE_SECRETARY),
                         "Secretary"
                     ]
                 }
@@ -199,44 +478,43 @@ class DocumentGenerator:
 
     def _generate_consent_action(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Generate content for consent action."""
+        get = data.get
+        company = get("company", DEFAULT_COMPANY)
+
         return {
             "title": "ACTION BY WRITTEN CONSENT OF THE BOARD OF DIRECTORS",
-            "company": data.get("company", "Atlas Machine and Supply, Inc."),
-            "date": data.get("date", datetime.now().strftime("%B %d, %Y")),
+            "company": company,
+            "date": _document_date(data),
             "sections": [
                 {
                     "heading": "",
                     "content": [
-                        f"The undersigned, being all of the Directors of {data.get('company', 'Atlas Machine and Supply, Inc.')}, hereby consent to the following action(s) without a meeting:"
+                        f"The undersigned, being all of the Directors of {company}, hereby consent to the following action(s) without a meeting:"
                     ]
                 },
                 {
                     "heading": "RESOLVED",
-                    "content": data.get("resolutions", [])
+                    "content": get("resolutions", [])
                 },
                 {
                     "heading": "SIGNATURES",
                     "content": [
                         "",
                         "This action is effective as of the date signed by all Directors.",
-                        ""
-                    ] + [
-                        f"\n_" + "_" * 40 + f"\n{director}\nDirector\nDate: _____________\n"
-                        for director in data.get("directors", [])
+                        "",
+                        *map(DIRECTOR_SIGNATURE_TEMPLATE.format, get("directors", []))
                     ]
                 }
             ]
         }
 
-    def _generate_docx(self, content: Dict[str, Any], data: Dict[str, Any]) -> bytes:
-        """Generate DOCX document from content."""
-        doc = Document()
+    def _generate_docx(self, content: Dict[str, Any], data: Dict[str, Any], sink: BinaryIO) -> None:
+        """Generate DOCX document from content into sink."""
+        if self.use_fast_docx:
+            self._generate_docx_direct(content, sink)
+            return
 
-        # Set default font
-        style = doc.styles['Normal']
-        font = style.font
-        font.name = 'Times New Roman'
-        font.size = Pt(12)
+        doc = Document(io.BytesIO(self._get_docx_skeleton()))
 
         # Add title
         title = doc.add_heading(content["title"], 0)
@@ -258,31 +536,131 @@ class DocumentGenerator:
 
         doc.add_paragraph()  # Add spacing
 
-        # Add sections
+        # Add sections as raw paragraph XML parsed in one call, rather than one
+        # add_paragraph/add_heading round trip per clause
+        paragraphs = [DOCX_FRAGMENT_START]
         for section in content["sections"]:
             if section["heading"]:
-                doc.add_heading(section["heading"], 3)
+                paragraphs.append(_docx_paragraph(section["heading"], "Heading3"))
 
             if isinstance(section["content"], list):
-                for item in section["content"]:
-                    if item:  # Skip empty strings
-                        doc.add_paragraph(item)
+                paragraphs.extend(_docx_paragraph(item) for item in section["content"] if item)
             else:
-                doc.add_paragraph(section["content"])
+                paragraphs.append(_docx_paragraph(section["content"]))
+
+            paragraphs.append(_docx_paragraph())  # Add spacing between sections
+        paragraphs.append(DOCX_FRAGMENT_END)
+
+        # Paragraphs must precede the body's trailing section properties
+        section_properties = doc.element.body.find(qn("w:sectPr"))
+        for paragraph in list(parse_xml("".join(paragraphs))):
+            section_properties.addprevious(paragraph)
+
+        doc.save(sink)
+
+    @staticmethod
+    @lru_cache(maxsize=1)
+    def _get_docx_skeleton() -> bytes:
+        """
+        Build the python-docx starting document once.
+
+        Loading python-docx's default template and restyling Normal happens on
+        the first call; later documents reopen these bytes from memory.
+        """
+        doc = Document()
 
-            doc.add_paragraph()  # Add spacing between sections
+        # Set default font
+        style = doc.styles['Normal']
+        font = style.font
+        font.name = 'Times New Roman'
+        font.size = Pt(12)
 
-        # Save to bytes
         buffer = io.BytesIO()
         doc.save(buffer)
-        buffer.seek(0)
         return buffer.getvalue()
 
-    def _generate_pdf(self, content: Dict[str, Any], data: Dict[str, Any]) -> bytes:
-        """Generate PDF document from content."""
-        buffer = io.BytesIO()
+    def _generate_docx_direct(self, content: Dict[str, Any], sink: BinaryIO) -> None:
+        """
+        Generate a DOCX document by writing its XML parts directly.
+
+        Produces the same layout as the python-docx path without building an
+        lxml tree or unpacking python-docx's default template.
+        """
+        paragraphs = [
+            DOCX_DOCUMENT_START,
+            _docx_paragraph(content["title"], "Title", center=True),
+            _docx_paragraph(content["company"], "Heading2", center=True),
+        ]
+
+        if "date" in content:
+            paragraphs.append(_docx_paragraph(content["date"], center=True))
+
+        if "resolution_number" in content and content["resolution_number"]:
+            paragraphs.append(_docx_paragraph(f"Resolution No. {content['resolution_number']}", center=True))
+
+        paragraphs.append(_docx_paragraph())  # Add spacing
+
+        for section in content["sections"]:
+            if section["heading"]:
+                paragraphs.append(_docx_paragraph(section["heading"], "Heading3"))
+
+            if isinstance(section["content"], list):
+                paragraphs.extend(_docx_paragraph(item) for item in section["content"] if item)
+            else:
+                paragraphs.append(_docx_paragraph(section["content"]))
+
+            paragraphs.append(_docx_paragraph())  # Add spacing between sections
+
+        paragraphs.append(DOCX_DOCUMENT_END)
+
+        with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as package:
+            for name, part in DOCX_STATIC_PARTS:
+                package.writestr(name, part)
+            package.writestr("word/document.xml", "".join(paragraphs).encode())
+
+    @staticmethod
+    @lru_cache(maxsize=1)
+    def _get_pdf_styles() -> Dict[str, ParagraphStyle]:
+        """Build the PDF paragraph styles once; they do not depend on the document."""
+        styles = getSampleStyleSheet()
+        body_style = ParagraphStyle(
+            'BodyStyle',
+            parent=styles['BodyText'],
+            fontSize=11,
+            alignment=TA_JUSTIFY,
+            spaceAfter=6
+        )
+        return {
+            "title": ParagraphStyle(
+                'CustomTitle',
+                parent=styles['Title'],
+                fontSize=16,
+                alignment=TA_CENTER,
+                spaceAfter=12
+            ),
+            "company": ParagraphStyle(
+                'CompanyStyle',
+                parent=styles['Heading2'],
+                fontSize=14,
+                alignment=TA_CENTER,
+                spaceAfter=12
+            ),
+            "heading": ParagraphStyle(
+                'HeadingStyle',
+                parent=styles['Heading3'],
+                fontSize=12,
+                bold=True,
+                spaceAfter=6
+            ),
+            "body": body_style,
+            "date": ParagraphStyle('DateStyle', parent=body_style, alignment=TA_CENTER),
+            "resolution_number": ParagraphStyle('ResNumStyle', parent=body_style, alignment=TA_CENTER),
+        }
+
+    def _generate_pdf(self, content: Dict[str, Any], data: Dict[str, Any], sink: BinaryIO) -> None:
+        """Generate PDF document from content into sink."""
         doc = SimpleDocTemplate(
-            buffer,
+            sink,
             pagesize=letter,
             rightMargin=72,
             leftMargin=72,
@@ -293,36 +671,11 @@ class DocumentGenerator:
         # Container for the 'Flowable' objects
         elements = []
 
-        # Define styles
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Title'],
-            fontSize=16,
-            alignment=TA_CENTER,
-            spaceAfter=12
-        )
-        company_style = ParagraphStyle(
-            'CompanyStyle',
-            parent=styles['Heading2'],
-            fontSize=14,
-            alignment=TA_CENTER,
-            spaceAfter=12
-        )
-        heading_style = ParagraphStyle(
-            'HeadingStyle',
-            parent=styles['Heading3'],
-            fontSize=12,
-            bold=True,
-            spaceAfter=6
-        )
-        body_style = ParagraphStyle(
-            'BodyStyle',
-            parent=styles['BodyText'],
-            fontSize=11,
-            alignment=TA_JUSTIFY,
-            spaceAfter=6
-        )
+        styles = self._get_pdf_styles()
+        title_style = styles["title"]
+        company_style = styles["company"]
+        heading_style = styles["heading"]
+        body_style = styles["body"]
 
         # Add title
         elements.append(Paragraph(content["title"], title_style))
@@ -334,109 +687,49 @@ class DocumentGenerator:
 
         # Add date if present
         if "date" in content:
-            date_style = ParagraphStyle('DateStyle', parent=body_style, alignment=TA_CENTER)
-            elements.append(Paragraph(content["date"], date_style))
+            elements.append(Paragraph(content["date"], styles["date"]))
             elements.append(Spacer(1, 6))
 
         # Add resolution number if present
         if "resolution_number" in content and content["resolution_number"]:
-            res_style = ParagraphStyle('ResNumStyle', parent=body_style, alignment=TA_CENTER)
-            elements.append(Paragraph(f"Resolution No. {content['resolution_number']}", res_style))
+            elements.append(Paragraph(f"Resolution No. {content['resolution_number']}", styles["resolution_number"]))
             elements.append(Spacer(1, 12))
 
         elements.append(Spacer(1, 12))
 
         # Add sections
+        append = elements.append
+        extend = elements.extend
         for section in content["sections"]:
-            if section["heading"]:
-                elements.append(Paragraph(section["heading"], heading_style))
-                elements.append(Spacer(1, 6))
-
-            if isinstance(section["content"], list):
-                for item in section["content"]:
+            heading = section["heading"]
+            if heading:
+                extend((Paragraph(heading, heading_style), Spacer(1, 6)))
+
+            items = section["content"]
+            if isinstance(items, list):
+                # Each non-empty item becomes a paragraph followed by a small spacer
+                for item in items:
                     if item:  # Skip empty strings
-                        elements.append(Paragraph(item, body_style))
-                        elements.append(Spacer(1, 3))
+                        append(Paragraph(item, body_style))
+                        append(Spacer(1, 3))
             else:
-                elements.append(Paragraph(section["content"], body_style))
-                elements.append(Spacer(1, 3))
+                extend((Paragraph(items, body_style), Spacer(1, 3)))
 
-            elements.append(Spacer(1, 12))
+            append(Spacer(1, 12))
 
         # Build PDF
         doc.build(elements)
 
-        # Get the value of the BytesIO buffer and return
-        buffer.seek(0)
-        return buffer.getvalue()
-
     def get_template_fields(self, template_type: str) -> Dict[str, Any]:
         """
         Get the required and optional fields for a template type.
 
+        The returned dictionary is shared between callers and must not be modified.
+
         Returns:
             Dictionary describing fields needed for the template
         """
-        templates = {
-            "board_resolution": {
-                "required": ["resolution_title", "resolved_clauses"],
-                "optional": ["company", "resolution_number", "date", "whereas_clauses", "secretary_name"],
-                "fields": {
-                    "company": {"type": "string", "description": "Company name"},
-                    "resolution_number": {"type": "string", "description": "Resolution number/identifier"},
-                    "date": {"type": "string", "description": "Date of resolution (MM/DD/YYYY)"},
-                    "resolution_title": {"type": "string", "description": "Title of the resolution"},
-                    "whereas_clauses": {"type": "array", "description": "List of WHEREAS clauses"},
-                    "resolved_clauses": {"type": "array", "description": "List of RESOLVED clauses"},
-                    "secretary_name": {"type": "string", "description": "Name of corporate secretary"}
-                }
-            },
-            "meeting_minutes": {
-                "required": ["attendees", "matters_discussed"],
-                "optional": ["company", "date", "time", "location", "absent", "guests", "chair",
-                            "minutes_approval", "resolutions", "adjournment_time", "secretary_name"],
-                "fields": {
-                    "company": {"type": "string", "description": "Company name"},
-                    "date": {"type": "string", "description": "Meeting date"},
-                    "time": {"type": "string", "description": "Meeting start time"},
-                    "location": {"type": "string", "description": "Meeting location"},
-                    "attendees": {"type": "array", "description": "List of attendees"},
-                    "absent": {"type": "array", "description": "List of absent members"},
-                    "guests": {"type": "array", "description": "List of guests"},
-                    "chair": {"type": "string", "description": "Meeting chair/president"},
-                    "minutes_approval": {"type": "array", "description": "Minutes approval text"},
-                    "matters_discussed": {"type": "array", "description": "List of matters discussed"},
-                    "resolutions": {"type": "array", "description": "List of resolutions adopted"},
-                    "adjournment_time": {"type": "string", "description": "Adjournment time"},
-                    "secretary_name": {"type": "string", "description": "Name of corporate secretary"}
-                }
-            },
-            "notice": {
-                "required": ["meeting_date", "meeting_time", "meeting_location", "agenda_items"],
-                "optional": ["company", "date", "secretary_name"],
-                "fields": {
-                    "company": {"type": "string", "description": "Company name"},
-                    "date": {"type": "string", "description": "Notice date"},
-                    "meeting_date": {"type": "string", "description": "Date of meeting"},
-                    "meeting_time": {"type": "string", "description": "Time of meeting"},
-                    "meeting_location": {"type": "string", "description": "Location of meeting"},
-                    "agenda_items": {"type": "array", "description": "List of agenda items"},
-                    "secretary_name": {"type": "string", "description": "Name of corporate secretary"}
-                }
-            },
-            "consent_action": {
-                "required": ["resolutions", "directors"],
-                "optional": ["company", "date"],
-                "fields": {
-                    "company": {"type": "string", "description": "Company name"},
-                    "date": {"type": "string", "description": "Effective date"},
-                    "resolutions": {"type": "array", "description": "List of resolutions"},
-                    "directors": {"type": "array", "description": "List of director names for signatures"}
-                }
-            }
-        }
-
-        if template_type not in templates:
+        if template_type not in self.TEMPLATE_FIELDS:
             raise ValueError(f"Unknown template type: {template_type}")
 
-        return templates[template_type]
+        return self.TEMPLATE_FIELDS[template_type]
@@ -1,26 +1,31 @@
+import asyncio
 import os
 import uuid
-import shutil
 from datetime import datetime
-from typing import Optional, BinaryIO
+from functools import lru_cache
+from typing import Optional, BinaryIO, Callable
 from pathlib import Path
 from werkzeug.utils import secure_filename
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, case
 
 from app.models.document import Document
 from app.schemas.document import DocumentCreate, DocumentUpdate
+from app.services.semantic_cache import invalidate_library_caches
 
 
-# Allowed file extensions and MIME types
-ALLOWED_EXTENSIONS = {'.pdf', '.docx', '.xlsx', '.doc', '.xls'}
-MIME_TYPE_MAP = {
-    '.pdf': 'application/pdf',
-    '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-    '.doc': 'application/msword',
-    '.xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-    '.xls': 'application/vnd.ms-excel',
+# Allowed file extensions mapped to (file_type, mime_type)
+EXTENSION_INFO = {
+    '.pdf': ('PDF', 'application/pdf'),
+    '.docx': ('Word', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'),
+    '.doc': ('Word', 'application/msword'),
+    '.xlsx': ('Excel', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    '.xls': ('Excel', 'application/vnd.ms-excel'),
 }
+UNKNOWN_EXTENSION_INFO = ('Unknown', 'application/octet-stream')
+
+ALLOWED_EXTENSIONS = set(EXTENSION_INFO)
+MIME_TYPE_MAP = {ext: mime_type for ext, (_, mime_type) in EXTENSION_INFO.items()}
 
 # Maximum file size (50MB)
 MAX_FILE_SIZE = 50 * 1024 * 1024
@@ -30,6 +35,12 @@ STORAGE_BASE = Path("storage")
 UPLOAD_BASE = Path("uploads")
 
 
+@lru_cache(maxsize=4096)
+def _safe_filename(name: str) -> str:
+    """secure_filename, memoized for names that are uploaded or generated repeatedly"""
+    return secure_filename(name)
+
+
 class DocumentService:
     """Service for document file operations"""
 
@@ -41,13 +52,17 @@ class DocumentService:
         Returns:
             (is_valid, error_message)
         """
+        return DocumentService._validate_ext(os.path.splitext(filename)[1].lower(), file_size)
+
+    @staticmethod
+    def _validate_ext(ext: str, file_size: int) -> tuple[bool, Optional[str]]:
+        """Validate an already lower-cased extension and file size"""
         # Check file size
         if file_size > MAX_FILE_SIZE:
             return False, f"File size exceeds maximum allowed size of {MAX_FILE_SIZE / (1024*1024)}MB"
 
         # Check file extension
-        ext = os.path.splitext(filename)[1].lower()
-        if ext not in ALLOWED_EXTENSIONS:
+        if ext not in EXTENSION_INFO:
             return False, f"File type '{ext}' not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"
 
         return True, None
@@ -60,12 +75,27 @@ class DocumentService:
         Returns:
             (file_path, stored_filename, mime_type)
         """
-        # Get file extension
-        ext = os.path.splitext(original_filename)[1].lower()
+        stem, ext = os.path.splitext(original_filename)
+        ext = ext.lower()
+        file_path, stored_filename = DocumentService._path_for_ext(ext, stem)
+
+        return file_path, stored_filename, EXTENSION_INFO.get(ext, UNKNOWN_EXTENSION_INFO)[1]
 
+    @staticmethod
+    def _path_for_ext(ext: str, stem: str) -> tuple[str, str]:
+        """
+        Build a unique storage path from an already split filename
+
+        Args:
+            ext: Lower-cased file extension including the dot
+            stem: Original filename without its extension
+
+        Returns:
+            (file_path, stored_filename)
+        """
         # Generate unique filename
-        unique_id = str(uuid.uuid4())
-        safe_name = secure_filename(os.path.splitext(original_filename)[0])
+        unique_id = uuid.uuid4().hex
+        safe_name = _safe_filename(stem)
         stored_filename = f"{unique_id}_{safe_name}{ext}"
 
         # Create year/month directory structure
@@ -76,10 +106,7 @@ class DocumentService:
         # Build full path
         file_path = os.path.join(str(STORAGE_BASE), year, month, stored_filename)
 
-        # Get MIME type
-        mime_type = MIME_TYPE_MAP.get(ext, 'application/octet-stream')
-
-        return file_path, stored_filename, mime_type
+        return file_path, stored_filename
 
     @staticmethod
     def ensure_directory(file_path: str) -> None:
@@ -101,6 +128,17 @@ class DocumentService:
         with open(file_path, 'wb') as f:
             f.write(file_content)
 
+    @staticmethod
+    async def save_upload_file_async(file_content: bytes, file_path: str) -> None:
+        """
+        Save uploaded file to disk without blocking the event loop
+
+        Args:
+            file_content: File content as bytes
+            file_path: Destination path
+        """
+        await asyncio.to_thread(DocumentService.save_upload_file, file_content, file_path)
+
     @staticmethod
     def _save_file(file_content: bytes, filename: str, original_filename: str) -> str:
         """
@@ -114,14 +152,52 @@ class DocumentService:
         Returns:
             Generated file path
         """
+        file_path = DocumentService._generated_file_path(filename, original_filename)
+        DocumentService.save_upload_file(file_content, file_path)
+        return file_path
+
+    @staticmethod
+    def _generated_file_path(filename: str, original_filename: str) -> str:
+        """Storage path for a generated file that keeps its given filename"""
         file_path, _, _ = DocumentService.generate_file_path(original_filename)
         # Use the provided filename instead of generated one
-        file_path = os.path.join(
+        return os.path.join(
             os.path.dirname(file_path),
             filename
         )
-        DocumentService.save_upload_file(file_content, file_path)
-        return file_path
+
+    @staticmethod
+    def save_generated_file(
+        write: Callable[[BinaryIO], None],
+        filename: str,
+        original_filename: str
+    ) -> tuple[str, int]:
+        """
+        Save a generated file by letting the generator write straight to disk.
+
+        Avoids rendering the whole document into memory and copying it again
+        on write. A partially written file is removed if the generator fails.
+
+        Args:
+            write: Callable that writes the file content to the given binary file
+            filename: Filename to use
+            original_filename: Original filename for extension detection
+
+        Returns:
+            (file_path, file_size)
+        """
+        file_path = DocumentService._generated_file_path(filename, original_filename)
+        DocumentService.ensure_directory(file_path)
+
+        try:
+            with open(file_path, 'wb') as f:
+                write(f)
+                file_size = f.tell()
+        except Exception:
+            DocumentService.delete_file(file_path)
+            raise
+
+        return file_path, file_size
 
     @staticmethod
     def delete_file(file_path: str) -> bool:
@@ -144,19 +220,10 @@ class DocumentService:
     def get_file_type(filename: str) -> str:
         """Get file type from filename"""
         ext = os.path.splitext(filename)[1].lower()
-
-        type_map = {
-            '.pdf': 'PDF',
-            '.docx': 'Word',
-            '.doc': 'Word',
-            '.xlsx': 'Excel',
-            '.xls': 'Excel',
-        }
-
-        return type_map.get(ext, 'Unknown')
+        return EXTENSION_INFO.get(ext, UNKNOWN_EXTENSION_INFO)[0]
 
     @staticmethod
-    def create_document(
+    async def create_document(
         db: Session,
         original_filename: str,
         file_size: int,
@@ -178,21 +245,23 @@ class DocumentService:
         Returns:
             Created Document instance
         """
+        # Split the filename once and reuse the extension for every step
+        stem, ext = os.path.splitext(original_filename)
+        ext = ext.lower()
+
         # Validate file
-        is_valid, error = DocumentService.validate_file(original_filename, file_size)
+        is_valid, error = DocumentService._validate_ext(ext, file_size)
         if not is_valid:
             raise ValueError(error)
 
         # Generate file path
-        file_path, stored_filename, mime_type = DocumentService.generate_file_path(
-            original_filename, folder
-        )
+        file_path, stored_filename = DocumentService._path_for_ext(ext, stem)
 
         # Save file to disk
-        DocumentService.save_upload_file(file_content, file_path)
+        await DocumentService.save_upload_file_async(file_content, file_path)
 
-        # Get file type
-        file_type = DocumentService.get_file_type(original_filename)
+        # Get file type and MIME type
+        file_type, mime_type = EXTENSION_INFO[ext]
 
         # Create database record
         document = Document(
@@ -209,6 +278,7 @@ class DocumentService:
         db.add(document)
         db.commit()
         db.refresh(document)
+        invalidate_library_caches()
 
         return document
 
@@ -247,10 +317,18 @@ class DocumentService:
 
         if search:
             search_filter = f"%{search}%"
-            query = query.filter(
-                (Document.original_filename.ilike(search_filter)) |
-                (Document.summary.ilike(search_filter))
-            )
+            if db.get_bind().dialect.name == "postgresql":
+                # Full-text match on the indexed search vector; the filename
+                # ILIKE keeps partial-name matches (e.g. "2024" in "minutes_2024")
+                query = query.filter(
+                    Document.search_vector.op('@@')(func.websearch_to_tsquery('english', search)) |
+                    (Document.original_filename.ilike(search_filter))
+                )
+            else:
+                query = query.filter(
+                    (Document.original_filename.ilike(search_filter)) |
+                    (Document.summary.ilike(search_filter))
+                )
 
         # Get total count
         total = query.count()
@@ -278,6 +356,7 @@ class DocumentService:
         document.updated_at = datetime.utcnow()
         db.commit()
         db.refresh(document)
+        invalidate_library_caches()
 
         return document
 
@@ -299,49 +378,44 @@ class DocumentService:
         # Delete from database (cascades to chunks)
         db.delete(document)
         db.commit()
+        invalidate_library_caches()
 
         return True
 
     @staticmethod
     def get_document_stats(db: Session, owner_id: Optional[int] = None) -> dict:
-        """Get statistics about documents"""
-        query = db.query(Document)
-
-        if owner_id:
-            query = query.filter(Document.owner_id == owner_id)
-
-        total = query.count()
-        total_size = query.with_entities(func.sum(Document.file_size)).scalar() or 0
+        """
+        Get statistics about documents
 
-        # Count by file type
-        by_type = {}
-        type_counts = db.query(
+        Counts, sizes and processed totals come from a single pass grouped by
+        (file_type, folder); per-type and per-folder counts are rolled up from
+        those groups instead of issuing a query for each statistic.
+        """
+        query = db.query(
             Document.file_type,
-            func.count(Document.id)
-        ).group_by(Document.file_type)
-
-        if owner_id:
-            type_counts = type_counts.filter(Document.owner_id == owner_id)
-
-        for file_type, count in type_counts.all():
-            by_type[file_type] = count
-
-        # Count by folder
-        by_folder = {}
-        folder_counts = db.query(
             Document.folder,
-            func.count(Document.id)
-        ).group_by(Document.folder)
+            func.count(Document.id),
+            func.coalesce(func.sum(Document.file_size), 0),
+            func.sum(case((Document.extracted_text.isnot(None), 1), else_=0))
+        )
 
         if owner_id:
-            folder_counts = folder_counts.filter(Document.owner_id == owner_id)
+            query = query.filter(Document.owner_id == owner_id)
 
-        for folder, count in folder_counts.all():
-            by_folder[folder] = count
+        total = 0
+        total_size = 0
+        processed = 0
+        by_type = {}
+        by_folder = {}
 
-        # Count processed vs unprocessed
-        processed = query.filter(Document.extracted_text.isnot(None)).count()
-        unprocessed = total - processed
+        for file_type, folder, count, size, processed_count in query.group_by(
+            Document.file_type, Document.folder
+        ):
+            total += count
+            total_size += size
+            processed += processed_count
+            by_type[file_type] = by_type.get(file_type, 0) + count
+            by_folder[folder] = by_folder.get(folder, 0) + count
 
         return {
             'total_documents': total,
@@ -349,5 +423,5 @@ class DocumentService:
             'by_file_type': by_type,
             'by_folder': by_folder,
             'processed_count': processed,
-            'unprocessed_count': unprocessed,
+            'unprocessed_count': total - processed,
         }
@@ -1,18 +1,101 @@
-from typing import List, Tuple, Optional
+from collections import OrderedDict
+from typing import Dict, List, Tuple, Optional
+import asyncio
+import hashlib
+import logging
+import threading
 import time
-from sqlalchemy.orm import Session
-from voyageai import Client as VoyageClient
+import numpy as np
+from sqlalchemy import cast, func, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, defer
+from pgvector.sqlalchemy import HALFVEC
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
+from voyageai import AsyncClient as AsyncVoyageClient, Client as VoyageClient
+from voyageai.error import RateLimitError
 
 from app.core.config import settings
-from app.models.document import DocumentChunk
+from app.models.document import DocumentChunk, EmbeddingCache
+
+logger = logging.getLogger(__name__)
+
+
+# Attempts per Voyage batch request when rate limited (429)
+EMBED_MAX_ATTEMPTS = 5
+
+# Single-text embeddings kept in memory (least recently used evicted first)
+EMBEDDING_CACHE_SIZE = 4096
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter for an API with requests-per-minute and
+    tokens-per-minute quotas.
+
+    Both buckets refill continuously; acquire() blocks only as long as needed
+    for the next call to fit, so small batches are not delayed at all while
+    quota remains.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        """
+        Initialize full buckets
+
+        Args:
+            requests_per_minute: Request quota per minute
+            tokens_per_minute: Token quota per minute
+        """
+        self.request_capacity = float(requests_per_minute)
+        self.token_capacity = float(tokens_per_minute)
+        self._requests = self.request_capacity
+        self._tokens = self.token_capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int) -> None:
+        """
+        Block until one request using the given number of tokens fits the quota
+
+        Args:
+            tokens: Estimated tokens the request will consume
+        """
+        tokens = min(float(tokens), self.token_capacity)
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                elapsed = now - self._updated
+                self._updated = now
+                self._requests = min(self.request_capacity, self._requests + elapsed * self.request_capacity / 60)
+                self._tokens = min(self.token_capacity, self._tokens + elapsed * self.token_capacity / 60)
+
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return
+
+                wait = max(
+                    (1 - self._requests) * 60 / self.request_capacity,
+                    (tokens - self._tokens) * 60 / self.token_capacity
+                )
+
+            time.sleep(wait)
+
+
+_voyage_rate_limiter = RateLimiter(settings.voyage_requests_per_minute, settings.voyage_tokens_per_minute)
+
+# Keyed by (model, input_type, sha256(text)) so long texts are not held as keys
+_embedding_cache: "OrderedDict[Tuple[str, str, bytes], Tuple[float, ...]]" = OrderedDict()
+_embedding_cache_lock = threading.Lock()
 
 
 class EmbeddingService:
     """Service for generating and managing vector embeddings using Voyage AI"""
 
     def __init__(self):
-        """Initialize Voyage AI client"""
+        """Initialize Voyage AI clients"""
         self.client = VoyageClient(api_key=settings.voyage_api_key)
+        self.async_client = AsyncVoyageClient(api_key=settings.voyage_api_key)
         self.model = settings.voyage_model  # voyage-law-2
         self.embedding_dimension = 1024  # voyage-law-2 uses 1024 dimensions
 
@@ -26,6 +109,10 @@ class EmbeddingService:
         Returns:
             Embedding vector (1024 dimensions) or None on error
         """
+        cached = self._cached_embedding(text, "document")
+        if cached is not None:
+            return cached
+
         try:
             # Use Voyage AI to generate embeddings
             result = self.client.embed(
@@ -35,12 +122,13 @@ class EmbeddingService:
             )
 
             if result.embeddings and len(result.embeddings) > 0:
+                self._cache_embedding(text, "document", result.embeddings[0])
                 return result.embeddings[0]
 
             return None
 
-        except Exception as e:
-            print(f"Error generating embedding: {e}")
+        except Exception:
+            logger.exception("Error generating embedding")
             return None
 
     def generate_query_embedding(self, query: str) -> Optional[List[float]]:
@@ -53,6 +141,10 @@ class EmbeddingService:
         Returns:
             Embedding vector (1024 dimensions) or None on error
         """
+        cached = self._cached_embedding(query, "query")
+        if cached is not None:
+            return cached
+
         try:
             # Use "query" input type for search queries
             result = self.client.embed(
@@ -62,18 +154,53 @@ class EmbeddingService:
             )
 
             if result.embeddings and len(result.embeddings) > 0:
+                self._cache_embedding(query, "query", result.embeddings[0])
                 return result.embeddings[0]
 
             return None
 
-        except Exception as e:
-            print(f"Error generating query embedding: {e}")
+        except Exception:
+            logger.exception("Error generating query embedding")
             return None
 
+    def _embedding_cache_key(self, text: str, input_type: str) -> Tuple[str, str, bytes]:
+        """Build the in-memory cache key for a text"""
+        return self.model, input_type, hashlib.sha256(text.encode()).digest()
+
+    def _cached_embedding(self, text: str, input_type: str) -> Optional[List[float]]:
+        """
+        Look up a previously generated embedding
+
+        Args:
+            text: Embedded text
+            input_type: Voyage input type ("document" or "query")
+
+        Returns:
+            Copy of the cached embedding, or None on miss
+        """
+        key = self._embedding_cache_key(text, input_type)
+        with _embedding_cache_lock:
+            cached = _embedding_cache.get(key)
+            if cached is None:
+                return None
+            _embedding_cache.move_to_end(key)
+        return list(cached)
+
+    def _cache_embedding(self, text: str, input_type: str, embedding: List[float]) -> None:
+        """Remember a generated embedding, evicting the least recently used beyond the cap"""
+        key = self._embedding_cache_key(text, input_type)
+        with _embedding_cache_lock:
+            _embedding_cache[key] = tuple(embedding)
+            _embedding_cache.move_to_end(key)
+            while len(_embedding_cache) > EMBEDDING_CACHE_SIZE:
+                _embedding_cache.popitem(last=False)
+
     def generate_embeddings_batch(
         self,
         texts: List[str],
-        batch_size: int = 128
+        batch_size: int = 128,
+        input_type: str = "document",
+        db: Optional[Session] = None
     ) -> List[Optional[List[float]]]:
         """
         Generate embeddings for multiple texts in batches
@@ -81,10 +208,16 @@ class EmbeddingService:
         Args:
             texts: List of texts to embed
             batch_size: Number of texts to process at once (Voyage supports up to 128)
+            input_type: Voyage input type ("document" or "query")
+            db: Database session; when given, embeddings are read from and
+                saved to the persistent embedding cache so only new text is sent
 
         Returns:
             List of embedding vectors (or None for failures)
         """
+        if db is not None:
+            return self._generate_embeddings_cached(db, texts, batch_size, input_type)
+
         embeddings = []
 
         for i in range(0, len(texts), batch_size):
@@ -92,11 +225,7 @@ class EmbeddingService:
 
             try:
                 # Batch embed with Voyage AI
-                result = self.client.embed(
-                    texts=batch,
-                    model=self.model,
-                    input_type="document"
-                )
+                result = self._embed_batch(batch, input_type)
 
                 if result.embeddings:
                     embeddings.extend(result.embeddings)
@@ -104,16 +233,204 @@ class EmbeddingService:
                     # If batch fails, add None for each text
                     embeddings.extend([None] * len(batch))
 
-                # Rate limiting - small delay between batches
-                time.sleep(0.1)
-
-            except Exception as e:
-                print(f"Error in batch embedding: {e}")
+            except Exception:
+                logger.exception("Error in batch embedding")
                 # Add None for failed batch
                 embeddings.extend([None] * len(batch))
 
         return embeddings
 
+    @retry(
+        retry=retry_if_exception_type(RateLimitError),
+        wait=wait_exponential_jitter(initial=1, max=30),
+        stop=stop_after_attempt(EMBED_MAX_ATTEMPTS),
+        reraise=True
+    )
+    def _embed_batch(self, batch: List[str], input_type: str):
+        """
+        Embed one batch within the shared Voyage quota, backing off on 429s
+
+        Args:
+            batch: Texts to embed in one request
+            input_type: Voyage input type ("document" or "query")
+
+        Returns:
+            Voyage embedding result
+        """
+        # Rough token estimate (about 4 characters per token)
+        _voyage_rate_limiter.acquire(sum(len(text) // 4 + 1 for text in batch))
+        return self.client.embed(texts=batch, model=self.model, input_type=input_type)
+
+    def _generate_embeddings_cached(
+        self,
+        db: Session,
+        texts: List[str],
+        batch_size: int,
+        input_type: str
+    ) -> List[Optional[List[float]]]:
+        """
+        Generate embeddings, embedding only texts missing from the persistent cache
+
+        Args:
+            db: Database session
+            texts: List of texts to embed
+            batch_size: Number of texts per Voyage request
+            input_type: Voyage input type ("document" or "query")
+
+        Returns:
+            List of embedding vectors (or None for failures), aligned with texts
+        """
+        hashes, found, missing = self._lookup_cached_embeddings(db, texts, input_type)
+
+        if missing:
+            new_embeddings = self.generate_embeddings_batch(
+                list(missing.values()),
+                batch_size=batch_size,
+                input_type=input_type
+            )
+            self._store_cached_embeddings(db, found, list(missing), new_embeddings)
+
+        return [found.get(content_hash) for content_hash in hashes]
+
+    def _lookup_cached_embeddings(
+        self,
+        db: Session,
+        texts: List[str],
+        input_type: str
+    ) -> Tuple[List[str], Dict[str, List[float]], Dict[str, str]]:
+        """
+        Read cached embeddings for texts from the persistent cache
+
+        Args:
+            db: Database session
+            texts: Texts to look up
+            input_type: Voyage input type ("document" or "query")
+
+        Returns:
+            (hash per text, embeddings found by hash, distinct missing texts by hash)
+        """
+        # Whitespace is collapsed before hashing so boilerplate repeated with
+        # different line wrapping or indentation shares one cached embedding
+        hashes = [
+            hashlib.sha256(f"{self.model}\x00{input_type}\x00{' '.join(text.split())}".encode()).hexdigest()
+            for text in texts
+        ]
+
+        found = {}
+        unique_hashes = list(set(hashes))
+        for i in range(0, len(unique_hashes), 1000):
+            found.update(
+                (content_hash, embedding.tolist() if hasattr(embedding, "tolist") else list(embedding))
+                for content_hash, embedding in db.query(
+                    EmbeddingCache.content_hash, EmbeddingCache.embedding
+                ).filter(EmbeddingCache.content_hash.in_(unique_hashes[i:i + 1000]))
+            )
+
+        # Embed each distinct missing text once
+        missing = {}
+        for text, content_hash in zip(texts, hashes):
+            if content_hash not in found:
+                missing.setdefault(content_hash, text)
+
+        return hashes, found, missing
+
+    def _store_cached_embeddings(
+        self,
+        db: Session,
+        found: Dict[str, List[float]],
+        missing_hashes: List[str],
+        new_embeddings: List[Optional[List[float]]]
+    ) -> None:
+        """
+        Save newly generated embeddings to the persistent cache and to found
+
+        The rows are only flushed; the caller owns the transaction and commits
+        them together with its own work.
+
+        Args:
+            db: Database session
+            found: Embeddings by hash, updated in place
+            missing_hashes: Hashes of the texts that were embedded
+            new_embeddings: Embeddings aligned with missing_hashes (None for failures)
+        """
+        rows = []
+        for content_hash, embedding in zip(missing_hashes, new_embeddings):
+            if embedding is not None:
+                found[content_hash] = embedding
+                rows.append({"content_hash": content_hash, "model": self.model, "embedding": embedding})
+
+        if rows:
+            db.execute(insert(EmbeddingCache).values(rows).on_conflict_do_nothing())
+            db.flush()
+
+    async def generate_embeddings_batch_async(
+        self,
+        texts: List[str],
+        batch_size: int = 128,
+        input_type: str = "document",
+        concurrency: int = 8,
+        db: Optional[Session] = None
+    ) -> List[Optional[List[float]]]:
+        """
+        Generate embeddings for multiple texts with several batches in flight at once
+
+        Args:
+            texts: List of texts to embed
+            batch_size: Number of texts per request (Voyage supports up to 128)
+            input_type: Voyage input type ("document" or "query")
+            concurrency: Maximum concurrent requests
+            db: Database session; when given, the persistent embedding cache is used
+
+        Returns:
+            List of embedding vectors (or None for failures), aligned with texts
+        """
+        if db is not None:
+            hashes, found, missing = await asyncio.to_thread(
+                self._lookup_cached_embeddings, db, texts, input_type
+            )
+            if missing:
+                new_embeddings = await self.generate_embeddings_batch_async(
+                    list(missing.values()),
+                    batch_size=batch_size,
+                    input_type=input_type,
+                    concurrency=concurrency
+                )
+                await asyncio.to_thread(
+                    self._store_cached_embeddings, db, found, list(missing), new_embeddings
+                )
+            return [found.get(content_hash) for content_hash in hashes]
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def embed_one(batch: List[str]) -> List[Optional[List[float]]]:
+            async with semaphore:
+                try:
+                    result = await self._embed_batch_async(batch, input_type)
+                    if result.embeddings:
+                        return result.embeddings
+                except Exception:
+                    logger.exception("Error in batch embedding")
+                return [None] * len(batch)
+
+        # gather preserves batch order
+        results = await asyncio.gather(*(
+            embed_one(texts[i:i + batch_size])
+            for i in range(0, len(texts), batch_size)
+        ))
+
+        return [embedding for batch_embeddings in results for embedding in batch_embeddings]
+
+    @retry(
+        retry=retry_if_exception_type(RateLimitError),
+        wait=wait_exponential_jitter(initial=1, max=30),
+        stop=stop_after_attempt(EMBED_MAX_ATTEMPTS),
+        reraise=True
+    )
+    async def _embed_batch_async(self, batch: List[str], input_type: str):
+        """Async counterpart of _embed_batch sharing the same Voyage quota"""
+        await asyncio.to_thread(_voyage_rate_limiter.acquire, sum(len(text) // 4 + 1 for text in batch))
+        return await self.async_client.embed(texts=batch, model=self.model, input_type=input_type)
+
     def store_chunk_with_embedding(
         self,
         db: Session,
@@ -132,11 +449,17 @@ class EmbeddingService:
             content: Chunk text content
             chunk_index: Index of this chunk
             page_number: Optional page number
-            embedding: Optional embedding vector
+            embedding: Optional embedding vector, stored L2-normalized
 
         Returns:
             Created DocumentChunk
         """
+        if embedding is not None:
+            vector = np.asarray(embedding, dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            if norm:
+                embedding = (vector / norm).tolist()
+
         chunk = DocumentChunk(
             document_id=document_id,
             content=content,
@@ -157,7 +480,8 @@ class EmbeddingService:
         query_embedding: List[float],
         limit: int = 10,
         min_score: float = 0.7,
-        document_ids: Optional[List[int]] = None
+        document_ids: Optional[List[int]] = None,
+        load_embeddings: bool = True
     ) -> List[Tuple[DocumentChunk, float]]:
         """
         Search for similar document chunks using vector similarity
@@ -168,17 +492,22 @@ class EmbeddingService:
             limit: Maximum results to return
             min_score: Minimum similarity score (0-1)
             document_ids: Optional filter by document IDs
+            load_embeddings: Whether to fetch each hit's embedding; callers that
+                only read content can skip transferring the 1024-dim vectors
 
         Returns:
             List of (chunk, similarity_score) tuples
         """
-        from sqlalchemy import text as sql_text
-
-        # Build query for vector similarity search using pgvector
-        # cosine distance: 1 - cosine_similarity, so lower is better
-        # We'll convert to similarity score (higher is better) by: 1 - distance
+        # pgvector ranks by cosine distance (1 - cosine similarity) using the
+        # half-precision HNSW index, so the column is cast to match the
+        # indexed expression; the query vector is sent as a bound parameter
+        distance = cast(DocumentChunk.embedding, HALFVEC(1024)).cosine_distance(
+            query_embedding
+        ).label("distance")
 
-        query = db.query(DocumentChunk)
+        query = db.query(DocumentChunk, distance)
+        if not load_embeddings:
+            query = query.options(defer(DocumentChunk.embedding))
 
         if document_ids:
             query = query.filter(DocumentChunk.document_id.in_(document_ids))
@@ -186,29 +515,74 @@ class EmbeddingService:
         # Only search chunks that have embeddings
         query = query.filter(DocumentChunk.embedding.isnot(None))
 
-        # Use pgvector's cosine distance operator (<=>)
-        # We need to convert the embedding list to a pgvector format
-        embedding_str = '[' + ','.join(map(str, query_embedding)) + ']'
+        rows = query.filter(
+            distance <= 1 - min_score
+        ).order_by(distance).limit(limit).all()
+
+        return [(chunk, 1 - chunk_distance) for chunk, chunk_distance in rows]
+
+    def search_chunks_by_keyword(
+        self,
+        db: Session,
+        terms: List[str],
+        limit: int = 10
+    ) -> List[DocumentChunk]:
+        """
+        Search for document chunks containing any of several exact terms using full-text search
+
+        Uses the 'simple' text search configuration so identifiers such as
+        statute numbers ("61.805") are matched verbatim rather than stemmed.
+        Chunks matching more of the terms rank higher.
+
+        Args:
+            db: Database session
+            terms: Terms of which at least one must appear in the chunk
+            limit: Maximum results to return
+
+        Returns:
+            List of chunks ordered by text search rank (best first)
+        """
+        if not terms:
+            return []
 
-        # Order by cosine distance and limit results
-        query = query.order_by(
-            sql_text(f"embedding <=> '{embedding_str}'")
-        ).limit(limit * 2)  # Get more results to filter by min_score
+        # OR the terms together (tsquery ||): a question citing two statutes
+        # should find chunks citing either one, not only chunks citing both
+        ts_query = None
+        for term in dict.fromkeys(terms):
+            term_query = func.plainto_tsquery('simple', term)
+            ts_query = term_query if ts_query is None else ts_query.op('||')(term_query)
 
-        all_chunks = query.all()
+        # Config is inlined (not bound) so the expression matches ix_document_chunks_content_tsv
+        ts_vector = func.to_tsvector(text("'simple'"), DocumentChunk.content)
 
-        results = []
-        for chunk in all_chunks:
-            if chunk.embedding is not None:
-                # Calculate cosine similarity
-                similarity = self._cosine_similarity(query_embedding, chunk.embedding)
-                if similarity >= min_score:
-                    results.append((chunk, similarity))
+        return db.query(DocumentChunk).filter(
+            ts_vector.op('@@')(ts_query)
+        ).order_by(
+            func.ts_rank(ts_vector, ts_query).desc()
+        ).limit(limit).all()
 
-        # Sort by similarity (descending)
-        results.sort(key=lambda x: x[1], reverse=True)
+    @staticmethod
+    def _cosine_similarities(query_embedding: List[float], embeddings: List[List[float]]) -> np.ndarray:
+        """
+        Calculate cosine similarity between a query and many stored vectors at once
 
-        return results[:limit]
+        Stored chunk embeddings are unit length (normalized on store, and
+        Voyage returns unit-length vectors), so only the query is normalized
+        and each score is a plain dot product.
+
+        Args:
+            query_embedding: Query vector
+            embeddings: Stored unit-length candidate vectors
+
+        Returns:
+            float32 array of similarity scores aligned with embeddings
+        """
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if not embeddings or norm == 0:
+            return np.zeros(len(embeddings), dtype=np.float32)
+
+        return np.asarray(embeddings, dtype=np.float32) @ (query / norm)
 
     def _cosine_similarity(
         self,
@@ -219,23 +593,22 @@ class EmbeddingService:
         Calculate cosine similarity between two vectors
 
         Args:
-            vec1: First vector
-            vec2: Second vector
+            vec1: First vector (list or array)
+            vec2: Second vector (list or array)
 
         Returns:
             Similarity score (0-1)
         """
-        if len(vec1) != len(vec2):
+        a = np.asarray(vec1, dtype=np.float32)
+        b = np.asarray(vec2, dtype=np.float32)
+        if a.shape != b.shape:
             return 0.0
 
-        dot_product = sum(a * b for a, b in zip(vec1, vec2))
-        magnitude1 = sum(a * a for a in vec1) ** 0.5
-        magnitude2 = sum(b * b for b in vec2) ** 0.5
-
-        if magnitude1 == 0 or magnitude2 == 0:
+        denominator = np.linalg.norm(a) * np.linalg.norm(b)
+        if denominator == 0:
             return 0.0
 
-        return dot_product / (magnitude1 * magnitude2)
+        return float(a @ b / denominator)
 
     def get_chunks_for_document(
         self,
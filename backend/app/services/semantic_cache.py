@@ -0,0 +1,433 @@
+"""
+Caches of assistant replies keyed by exact query text or by query embedding similarity.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Tuple, FrozenSet
+import re
+import threading
+import time
+import numpy as np
+
+
+# Numbers such as statute sections ("61.810", "271B.8-240"). Embeddings barely
+# tell them apart, so a similarity hit also requires the same set of numbers.
+NUMBER_PATTERN = re.compile(r"\d+[a-z]?(?:[.\-]\d+[a-z]?)*", re.IGNORECASE)
+
+
+def number_tokens(text: str) -> FrozenSet[str]:
+    """Return the set of numbers cited in a text, lowercased"""
+    return frozenset(token.lower() for token in NUMBER_PATTERN.findall(text))
+
+
+# Bumped whenever the document library changes; cached replies from an
+# earlier generation may cite removed or outdated documents and are ignored
+_library_generation = 0
+
+
+def invalidate_library_caches() -> None:
+    """Mark every cached reply stale after documents are added, reprocessed or deleted"""
+    global _library_generation
+    _library_generation += 1
+
+
+@dataclass
+class CachedResponse:
+    """Assistant reply stored for a previously answered query"""
+    content: str
+    citations: List[Dict[str, Any]]
+    generated_document_id: Optional[int]
+    created_at: float
+    generation: int
+
+
+class SemanticQueryCache:
+    """
+    In-process cache that returns a stored reply when a new query is a close
+    paraphrase of one already answered for the same user in the same
+    conversational context. Queries citing different numbers (statute
+    sections, dates) never match, and entries are dropped when the document
+    library changes.
+
+    Queries are stored as L2-normalized rows of one preallocated float32 ring
+    buffer, so similarity is a single contiguous matrix-vector product and
+    inserts overwrite the oldest slot in place.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.85,
+        ttl_seconds: int = 6 * 3600,
+        max_entries: int = 1024
+    ):
+        """
+        Initialize an empty cache
+
+        Args:
+            threshold: Minimum cosine similarity for a cache hit
+            ttl_seconds: Age after which entries are ignored
+            max_entries: Maximum number of cached replies (oldest overwritten first)
+        """
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._user_ids: List[Optional[int]] = [None] * max_entries
+        self._context_keys: List[Optional[str]] = [None] * max_entries
+        self._numbers: List[FrozenSet[str]] = [frozenset()] * max_entries
+        self._entries: List[Optional[CachedResponse]] = [None] * max_entries
+        self._matrix: Optional[np.ndarray] = None  # allocated on first put
+        self._inserted = 0
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> Optional[np.ndarray]:
+        """Convert an embedding to a unit-length float32 vector"""
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return None
+        return vector / norm
+
+    def lookup(
+        self,
+        user_id: int,
+        query: str,
+        query_embedding: List[float],
+        context_key: Optional[str] = None
+    ) -> Optional[CachedResponse]:
+        """
+        Find a cached reply for a semantically equivalent query
+
+        Args:
+            user_id: Owner of the cached replies to search
+            query: Text of the new query
+            query_embedding: Embedding of the new query
+            context_key: Identifies the conversation state the query was asked in
+
+        Returns:
+            CachedResponse on hit, None on miss
+        """
+        vector = self._normalize(query_embedding)
+        if vector is None:
+            return None
+        numbers = number_tokens(query)
+
+        with self._lock:
+            if self._matrix is None or self._matrix.shape[1] != vector.shape[0]:
+                return None
+
+            filled = min(self._inserted, self.max_entries)
+            scores = self._matrix[:filled] @ vector
+            now = time.time()
+
+            # Only order the slots that clear the threshold
+            passing = np.flatnonzero(scores >= self.threshold)
+            for index in passing[np.argsort(-scores[passing])]:
+                entry = self._entries[index]
+                if (
+                    self._user_ids[index] == user_id
+                    and self._context_keys[index] == context_key
+                    and self._numbers[index] == numbers
+                    and entry.generation == _library_generation
+                    and now - entry.created_at <= self.ttl_seconds
+                ):
+                    return entry
+
+        return None
+
+    def put(
+        self,
+        user_id: int,
+        query: str,
+        query_embedding: List[float],
+        content: str,
+        citations: List[Dict[str, Any]],
+        generated_document_id: Optional[int] = None,
+        context_key: Optional[str] = None
+    ) -> None:
+        """
+        Store an assistant reply for a query
+
+        Args:
+            user_id: Owner of the reply
+            query: Text of the query that produced the reply
+            query_embedding: Embedding of the query that produced the reply
+            content: Assistant reply text
+            citations: Citations emitted with the reply
+            generated_document_id: ID of a document generated during the turn
+            context_key: Identifies the conversation state the query was asked in
+        """
+        vector = self._normalize(query_embedding)
+        if vector is None or not content:
+            return
+
+        entry = CachedResponse(
+            content=content,
+            citations=citations,
+            generated_document_id=generated_document_id,
+            created_at=time.time(),
+            generation=_library_generation
+        )
+
+        with self._lock:
+            if self._matrix is None or self._matrix.shape[1] != vector.shape[0]:
+                # First insert (or embedding model change): allocate the buffer
+                self._matrix = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+                self._inserted = 0
+
+            slot = self._inserted % self.max_entries
+            self._matrix[slot] = vector
+            self._user_ids[slot] = user_id
+            self._context_keys[slot] = context_key
+            self._numbers[slot] = number_tokens(query)
+            self._entries[slot] = entry
+            self._inserted += 1
+
+
+class ExactQueryCache:
+    """
+    LRU cache of replies for repeats of the same question within a chat session.
+
+    Matching is on whitespace- and case-normalized text, so a hit needs no
+    embedding and is checked before the semantic cache. Like the semantic
+    cache, entries are scoped to the conversation state they were asked in,
+    so a repeated follow-up ("and the next one?") does not replay an old reply,
+    and dropped when the document library changes.
+    """
+
+    def __init__(self, ttl_seconds: int = 6 * 3600, max_entries: int = 1024):
+        """
+        Initialize an empty cache
+
+        Args:
+            ttl_seconds: Age after which entries are ignored and evicted
+            max_entries: Maximum number of cached replies (least recently used evicted first)
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[int, Optional[str], str], CachedResponse]" = OrderedDict()
+
+    @staticmethod
+    def _key(session_id: int, message: str, context_key: Optional[str]) -> Tuple[int, Optional[str], str]:
+        """Build the cache key for a message"""
+        return session_id, context_key, " ".join(message.split()).lower()
+
+    def lookup(
+        self,
+        session_id: int,
+        message: str,
+        context_key: Optional[str] = None
+    ) -> Optional[CachedResponse]:
+        """
+        Find a cached reply for the same message in the same session and context
+
+        Args:
+            session_id: Chat session ID
+            message: User's message
+            context_key: Identifies the conversation state the message was asked in
+
+        Returns:
+            CachedResponse on hit, None on miss
+        """
+        key = self._key(session_id, message, context_key)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if (
+                entry.generation != _library_generation
+                or time.time() - entry.created_at > self.ttl_seconds
+            ):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(
+        self,
+        session_id: int,
+        message: str,
+        content: str,
+        citations: List[Dict[str, Any]],
+        generated_document_id: Optional[int] = None,
+        context_key: Optional[str] = None
+    ) -> None:
+        """
+        Store an assistant reply for a message
+
+        Args:
+            session_id: Chat session ID
+            message: User's message
+            content: Assistant reply text
+            citations: Citations emitted with the reply
+            generated_document_id: ID of a document generated during the turn
+            context_key: Identifies the conversation state the message was asked in
+        """
+        if not content:
+            return
+
+        entry = CachedResponse(
+            content=content,
+            citations=citations,
+            generated_document_id=generated_document_id,
+            created_at=time.time(),
+            generation=_library_generation
+        )
+
+        key = self._key(session_id, message, context_key)
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+@dataclass
+class CachedToolResult:
+    """Tool response stored for a previously seen query"""
+    scope: Any
+    result: Dict[str, Any]
+    vector: Optional[np.ndarray]
+    numbers: FrozenSet[str]
+    created_at: float
+
+
+class ToolResultCache:
+    """
+    Short-lived LRU cache of tool responses.
+
+    Queries match on normalized text first; when an embedding is supplied, a
+    query can also match a cached one whose embedding is within the similarity
+    threshold and that cites the same numbers (so "KRS 61.810" never reuses the
+    results for "KRS 61.820"). Entries only match queries with the same scope
+    (e.g. the requested result limit).
+    """
+
+    def __init__(self, threshold: float = 0.95, ttl_seconds: int = 300, max_entries: int = 256):
+        """
+        Initialize an empty cache
+
+        Args:
+            threshold: Minimum cosine similarity for an embedding match
+            ttl_seconds: Age after which entries are ignored and evicted
+            max_entries: Maximum number of cached responses (least recently used evicted first)
+        """
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[Any, str], CachedToolResult]" = OrderedDict()
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_keys: List[Tuple[Any, str]] = []
+        self._matrix_stale = False
+
+    @staticmethod
+    def _key(scope: Any, query: str) -> Tuple[Any, str]:
+        """Build the cache key for a query"""
+        return scope, " ".join(query.split()).lower()
+
+    def lookup(
+        self,
+        scope: Any,
+        query: str,
+        query_embedding: Optional[List[float]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Find a cached response for an identical or, given an embedding, similar query
+
+        Args:
+            scope: Parameters that must match exactly for a hit
+            query: Query text
+            query_embedding: Embedding of the query, enabling similarity matches
+
+        Returns:
+            Cached tool response on hit, None on miss
+        """
+        key = self._key(scope, query)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry.created_at <= self.ttl_seconds:
+                self._entries.move_to_end(key)
+                return entry.result
+
+            if query_embedding is None:
+                return None
+            vector = SemanticQueryCache._normalize(query_embedding)
+            if vector is None:
+                return None
+
+            self._rebuild_matrix()
+            if self._matrix is None:
+                return None
+
+            numbers = number_tokens(query)
+            scores = self._matrix @ vector
+            passing = np.flatnonzero(scores >= self.threshold)
+            for index in passing[np.argsort(-scores[passing])]:
+                matrix_key = self._matrix_keys[index]
+                entry = self._entries[matrix_key]
+                if (
+                    entry.scope == scope
+                    and entry.numbers == numbers
+                    and now - entry.created_at <= self.ttl_seconds
+                ):
+                    self._entries.move_to_end(matrix_key)
+                    return entry.result
+
+        return None
+
+    def put(
+        self,
+        scope: Any,
+        query: str,
+        result: Dict[str, Any],
+        query_embedding: Optional[List[float]] = None
+    ) -> None:
+        """
+        Store a tool response for a query
+
+        Args:
+            scope: Parameters that must match exactly for a hit
+            query: Query text
+            result: Tool response to return on later hits
+            query_embedding: Embedding of the query, enabling similarity matches
+        """
+        vector = None
+        if query_embedding is not None:
+            vector = SemanticQueryCache._normalize(query_embedding)
+
+        key = self._key(scope, query)
+        entry = CachedToolResult(
+            scope=scope,
+            result=result,
+            vector=vector,
+            numbers=number_tokens(query),
+            created_at=time.time()
+        )
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix_stale = True
+
+    def _rebuild_matrix(self) -> None:
+        """Restack embedded entries into the similarity matrix (caller must hold the lock)"""
+        if not self._matrix_stale:
+            return
+
+        self._matrix_keys = [key for key, entry in self._entries.items() if entry.vector is not None]
+        self._matrix = np.vstack(
+            [self._entries[key].vector for key in self._matrix_keys]
+        ) if self._matrix_keys else None
+        self._matrix_stale = False
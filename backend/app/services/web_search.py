@@ -2,24 +2,89 @@
 Web search service for finding Kentucky statutes and legal information.
 """
 
+import asyncio
+import html as html_lib
+import logging
+import re
 import httpx
 from typing import List, Dict, Any, Optional
-import json
-from urllib.parse import quote
+
+# Fast C-backed HTML parser; regular expressions are used when it is missing
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+from app.core.config import settings
+from app.services.semantic_cache import ToolResultCache
+
+logger = logging.getLogger(__name__)
+
+
+USER_AGENT = "Board Management Tool Legal Assistant/1.0"
+SEARCH_TIMEOUT_SECONDS = 10.0
+
+# Queries shorter than this, or made only of these words, are not worth a search
+MIN_QUERY_LENGTH = 3
+QUERY_STOPWORDS = frozenset({
+    "a", "an", "and", "are", "for", "in", "is", "law", "laws", "kentucky", "ky",
+    "of", "on", "or", "statute", "statutes", "the", "to", "what", "krs"
+})
+
+# DuckDuckGo Lite result markup, for parsing without selectolax
+RESULT_LINK_PATTERN = re.compile(r"<a\b([^>]*\bresult-link\b[^>]*)>(.*?)</a>", re.S)
+RESULT_SNIPPET_PATTERN = re.compile(r"<td\b[^>]*\bresult-snippet\b[^>]*>(.*?)</td>", re.S)
+HREF_PATTERN = re.compile(r"""\bhref=["']([^"']*)["']""")
+TAG_PATTERN = re.compile(r"<[^>]+>")
+
+# Class names marking sponsored results, which do not count towards the limit
+AD_RESULT_MARKERS = ("result--ad", "result-sponsored")
+
+# Shared HTTP client so keep-alive connections and TLS sessions to the search
+# backend are reused across requests
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the process-wide web search HTTP client, creating it on first use"""
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            timeout=SEARCH_TIMEOUT_SECONDS,
+            http2=True,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            headers={"User-Agent": USER_AGENT},
+            follow_redirects=True
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Close the shared web search HTTP client (called at application shutdown)"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+# Process-wide cache of search results keyed by (search kind, limit) and query
+# text; queries with an embedding also hit on close paraphrases of cached ones
+# that cite the same statute numbers
+_result_cache = ToolResultCache(
+    threshold=settings.web_search_cache_threshold,
+    ttl_seconds=settings.web_search_cache_ttl_seconds,
+    max_entries=1024
+)
 
 
 class WebSearchService:
     """Service for searching web resources, particularly Kentucky statutes."""
 
-    def __init__(self):
-        """Initialize the web search service."""
-        self.timeout = 10.0
-        self.user_agent = "Board Management Tool Legal Assistant/1.0"
-
     async def search_kentucky_statutes(
         self,
         query: str,
-        limit: int = 5
+        limit: int = 5,
+        query_embedding: Optional[List[float]] = None
     ) -> List[Dict[str, Any]]:
         """
         Search for Kentucky statutes and legal information.
@@ -27,26 +92,49 @@ class WebSearchService:
         Args:
             query: Search query
             limit: Maximum number of results
+            query_embedding: Embedding of the query, letting paraphrases reuse cached results
 
         Returns:
             List of search results with title, url, and snippet
         """
+        if self._is_trivial_query(query):
+            return []
+
+        cached = _result_cache.lookup(("statutes", limit), query, query_embedding)
+        if cached is not None:
+            return cached
+
         try:
             # Use DuckDuckGo's instant answer API for Kentucky statute searches
             # Format the query to focus on Kentucky law
-            search_query = f"Kentucky statute {query} site:lrc.ky.gov OR site:legislature.ky.gov"
-
-            results = await self._search_duckduckgo(search_query, limit)
-
-            # If no results from official sites, try broader search
-            if not results:
-                search_query = f"Kentucky {query} law statute"
-                results = await self._search_duckduckgo(search_query, limit)
-
+            site_query = f"Kentucky statute {query} site:lrc.ky.gov OR site:legislature.ky.gov"
+            broad_query = f"Kentucky {query} law statute"
+
+            if settings.web_search_parallel_fallback:
+                # Run both queries at once; official-site results win when present
+                site_results, broad_results = await asyncio.gather(
+                    self._search_duckduckgo(site_query, limit),
+                    self._search_duckduckgo(broad_query, limit),
+                    return_exceptions=True
+                )
+                if isinstance(site_results, list) and site_results:
+                    results = site_results
+                else:
+                    results = broad_results if isinstance(broad_results, list) else []
+            else:
+                results = await self._search_duckduckgo(site_query, limit)
+
+                # If no results from official sites, try broader search
+                if not results:
+                    results = await self._search_duckduckgo(broad_query, limit)
+
+            # Empty results may be a transient failure, so only hits are cached
+            if results:
+                _result_cache.put(("statutes", limit), query, results, query_embedding)
             return results
 
-        except Exception as e:
-            print(f"Error in web search: {e}")
+        except Exception:
+            logger.exception("Statute web search failed")
             return []
 
     async def _search_duckduckgo(
@@ -66,88 +154,121 @@ class WebSearchService:
         """
         try:
             # Use DuckDuckGo Lite (HTML) interface for simple scraping
-            url = f"https://lite.duckduckgo.com/lite/"
-
-            headers = {
-                "User-Agent": self.user_agent
-            }
-
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                # First, get the search page
-                response = await client.post(
-                    url,
-                    data={"q": query},
-                    headers=headers,
-                    follow_redirects=True
-                )
-
+            url = "https://lite.duckduckgo.com/lite/"
+
+            # Lite answers POSTs directly; a redirect usually means a rate-limit or
+            # challenge page, so it is reported rather than followed
+            async with get_http_client().stream(
+                "POST", url, data={"q": query}, follow_redirects=False
+            ) as response:
+                if response.is_redirect:
+                    logger.warning("DuckDuckGo search redirected to %s", response.headers.get('location'))
+                    return []
                 if response.status_code != 200:
                     return []
 
-                # Parse the HTML response (simple parsing)
-                html = response.text
-                results = self._parse_duckduckgo_html(html, limit)
+                # Stop downloading once the first `limit` results have arrived;
+                # leaving the block closes the response
+                html = ""
+                async for text in response.aiter_text():
+                    html += text
+                    if self._has_complete_results(html, limit):
+                        break
 
-                return results
+            # Parse the HTML response (the parser tolerates a truncated page)
+            return self._parse_duckduckgo_html(html, limit)
 
-        except Exception as e:
-            print(f"DuckDuckGo search error: {e}")
+        except Exception:
+            logger.exception("DuckDuckGo search failed")
             return []
 
+    @staticmethod
+    def _is_trivial_query(query: str) -> bool:
+        """Check whether a query is too short or generic to return useful results"""
+        words = query.lower().split()
+        return (
+            len(" ".join(words)) < MIN_QUERY_LENGTH
+            or all(word in QUERY_STOPWORDS for word in words)
+        )
+
+    @staticmethod
+    def _has_complete_results(html: str, limit: int) -> bool:
+        """
+        Check whether a partially received DuckDuckGo Lite page already holds
+        `limit` organic results, i.e. the limit-th non-ad result snippet cell
+        has been closed. A snippet belongs to an ad when the markup since the
+        previous snippet carries an ad class.
+        """
+        position = html.find("<body")
+        if position == -1:
+            return False
+
+        organic = 0
+        while organic < limit:
+            snippet = html.find("result-snippet", position)
+            if snippet == -1:
+                return False
+            if not any(marker in html[position:snippet] for marker in AD_RESULT_MARKERS):
+                organic += 1
+            position = snippet + len("result-snippet")
+
+        return html.find("</td>", position) != -1
+
+    @staticmethod
+    def _extract_duckduckgo_results(html: str):
+        """
+        Yield (url, title, snippet) for each result in DuckDuckGo Lite HTML.
+
+        Each result is a `a.result-link` anchor followed by a `td.result-snippet`
+        cell, so links and snippets are paired in document order.
+        """
+        if LexborHTMLParser is not None:
+            tree = LexborHTMLParser(html)
+            for link, snippet in zip(tree.css('a.result-link'), tree.css('td.result-snippet')):
+                yield (
+                    link.attributes.get('href') or '',
+                    link.text(separator=' ', strip=True),
+                    snippet.text(separator=' ', strip=True)
+                )
+            return
+
+        def text_of(fragment: str) -> str:
+            return " ".join(html_lib.unescape(TAG_PATTERN.sub(" ", fragment)).split())
+
+        links = RESULT_LINK_PATTERN.finditer(html)
+        snippets = RESULT_SNIPPET_PATTERN.finditer(html)
+        for link, snippet in zip(links, snippets):
+            href = HREF_PATTERN.search(link.group(1))
+            yield (
+                html_lib.unescape(href.group(1)) if href else '',
+                text_of(link.group(2)),
+                text_of(snippet.group(1))
+            )
+
     def _parse_duckduckgo_html(self, html: str, limit: int) -> List[Dict[str, Any]]:
         """
         Parse DuckDuckGo Lite HTML to extract search results.
-
-        Note: This is a simple parser. For production, consider using BeautifulSoup
-        or the official DuckDuckGo API.
         """
         results = []
 
         try:
-            # Simple extraction using string parsing
-            # Look for result links in the HTML
-            lines = html.split('\\n')
-            current_result = {}
-
-            for line in lines:
-                # Look for result links
-                if '<a rel=' in line and 'http' in line:
-                    # Extract URL
-                    start = line.find('href="') + 6
-                    end = line.find('"', start)
-                    if start > 5 and end > start:
-                        url = line[start:end]
-
-                        # Extract title (text between >< in the link)
-                        title_start = line.find('>', end) + 1
-                        title_end = line.find('<', title_start)
-                        if title_start > 0 and title_end > title_start:
-                            title = line[title_start:title_end].strip()
-
-                            if url and title and not url.startswith('//duckduckgo'):
-                                current_result = {
-                                    'title': title,
-                                    'url': url,
-                                    'snippet': ''
-                                }
-
-                # Look for snippets (following the link)
-                elif current_result and '<td class="result-snippet"' in line:
-                    # Get next few lines for snippet
-                    snippet_start = line.find('>') + 1
-                    snippet = line[snippet_start:].strip()
-                    if snippet and snippet != '</td>':
-                        current_result['snippet'] = snippet.replace('<b>', '').replace('</b>', '').replace('</td>', '')
-                        results.append(current_result)
-                        current_result = {}
-
-                        if len(results) >= limit:
-                            break
-
-        except Exception as e:
-            print(f"HTML parsing error: {e}")
-
-        return results[:limit]
+            for url, title, snippet in self._extract_duckduckgo_results(html):
+                if not url or not title or url.startswith('//duckduckgo'):
+                    continue
+
+                results.append({
+                    'title': title,
+                    'url': url,
+                    'snippet': snippet
+                })
+
+                if len(results) >= limit:
+                    break
+
+        except Exception:
+            logger.exception("Failed to parse DuckDuckGo results")
+
+        return results
 
     def format_search_results_for_context(
         self,
@@ -165,16 +286,12 @@ class WebSearchService:
         if not results:
             return "No web search results found."
 
-        formatted = "Web Search Results:\\n\\n"
-
+        parts = ["Web Search Results:\n\n"]
         for i, result in enumerate(results, 1):
-            formatted += f"{i}. {result['title']}\\n"
-            formatted += f"   URL: {result['url']}\\n"
-            if result.get('snippet'):
-                formatted += f"   {result['snippet']}\\n"
-            formatted += "\\n"
+            snippet = f"   {result['snippet']}\n" if result.get('snippet') else ""
+            parts.append(f"{i}. {result['title']}\n   URL: {result['url']}\n{snippet}\n")
 
-        return formatted
+        return "".join(parts)
 
     async def search_general(
         self,
@@ -191,4 +308,14 @@ class WebSearchService:
         Returns:
             List of search results
         """
-        return await self._search_duckduckgo(query, limit)
+        if self._is_trivial_query(query):
+            return []
+
+        cached = _result_cache.lookup(("general", limit), query)
+        if cached is not None:
+            return cached
+
+        results = await self._search_duckduckgo(query, limit)
+        if results:
+            _result_cache.put(("general", limit), query, results)
+        return results
@@ -3,6 +3,7 @@
 Script to create an admin user for the Board Management Tool
 """
 import sys
+from sqlalchemy import exists
 from sqlalchemy.orm import Session
 from app.core.database import SessionLocal, engine, Base
 from app.core.security import get_password_hash
@@ -19,11 +20,11 @@ def create_admin_user(email: str, username: str, password: str, full_name: str):
     db: Session = SessionLocal()
     try:
         # Check if user already exists
-        existing_user = db.query(User).filter(
-            (User.email == email) | (User.username == username)
-        ).first()
+        user_exists = db.query(
+            exists().where((User.email == email) | (User.username == username))
+        ).scalar()
 
-        if existing_user:
+        if user_exists:
             print(f"Error: User with email '{email}' or username '{username}' already exists")
             return False
 
@@ -38,13 +39,14 @@ def create_admin_user(email: str, username: str, password: str, full_name: str):
         )
 
         db.add(user)
+        db.flush()  # Assigns the ID; reading it after commit would reload the row
+        user_id = user.id
         db.commit()
-        db.refresh(user)
 
         print(f"✓ Admin user created successfully!")
         print(f"  Email: {email}")
         print(f"  Username: {username}")
-        print(f"  User ID: {user.id}")
+        print(f"  User ID: {user_id}")
         return True
 
     except Exception as e:
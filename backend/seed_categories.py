@@ -18,6 +18,7 @@ from app.models.notification import Notification
 
 from app.core.database import SessionLocal
 from datetime import datetime
+from sqlalchemy import insert
 
 
 def create_default_categories():
@@ -125,31 +126,37 @@ def create_default_categories():
             },
         ]
         
-        def create_category(cat_data, parent_id=None):
-            """Recursively create categories"""
-            category = DocumentCategory(
-                name=cat_data["name"],
-                parent_id=parent_id,
-                icon=cat_data.get("icon"),
-                color=cat_data.get("color"),
-                description=cat_data.get("description"),
-                order=cat_data.get("order", 0)
-            )
-            db.add(category)
-            db.flush()  # Get the ID without committing
-            
-            print(f"  Created: {cat_data['name']}")
-            
-            # Create children
-            if "children" in cat_data:
-                for child_data in cat_data["children"]:
-                    create_category(child_data, category.id)
-            
-            return category
-        
-        # Create all categories
-        for cat_data in categories_data:
-            create_category(cat_data)
+        # Insert one tree level at a time with a Core executemany: each level is
+        # one batched INSERT ... RETURNING whose IDs (returned in parameter order)
+        # become the next level's parent_id values
+        category_table = DocumentCategory.__table__
+        insert_categories = insert(category_table).returning(
+            category_table.c.id, sort_by_parameter_order=True
+        )
+
+        level = [(cat_data, None) for cat_data in categories_data]
+        while level:
+            rows = [
+                {
+                    "name": cat_data["name"],
+                    "parent_id": parent_id,
+                    "icon": cat_data.get("icon"),
+                    "color": cat_data.get("color"),
+                    "description": cat_data.get("description"),
+                    "order": cat_data.get("order", 0),
+                }
+                for cat_data, parent_id in level
+            ]
+            ids = db.execute(insert_categories, rows).scalars().all()
+
+            for cat_data, _ in level:
+                print(f"  Created: {cat_data['name']}")
+
+            level = [
+                (child_data, category_id)
+                for (cat_data, _), category_id in zip(level, ids)
+                for child_data in cat_data.get("children", [])
+            ]
         
         # Create default tags
         print("\nCreating default document tags...")
@@ -163,9 +170,8 @@ def create_default_categories():
             {"name": "Historical", "color": "#6b7280"},
         ]
         
+        db.execute(insert(DocumentTag.__table__), default_tags)
         for tag_data in default_tags:
-            tag = DocumentTag(**tag_data)
-            db.add(tag)
             print(f"  Created tag: {tag_data['name']}")
         
         db.commit()